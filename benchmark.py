@@ -0,0 +1,333 @@
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import pythonparser
+import syntheticdata
+
+# The stringFormatter implementation before the tag tokenizer, kept to compare against
+def legacyStringFormatter(s):
+    if s is None:
+        return ''
+    if type(s) is int:
+        return str(s)
+    entryRaw = s
+    entrySafe = ''
+    for split in re.split('{|}', entryRaw):
+        parsing = split
+        if re.search('(@as+)\\s', parsing) is not None:
+            stringEnding = split[len(split) - 1]
+            parsing = pythonparser.actionParser[str(stringEnding)]
+        else:
+            parsing = re.sub('@([a-zA-Z]+)\\s', '', parsing)
+            if parsing.find('||') != -1:
+                parsing = re.split('\\|\\|', parsing)[1]
+            parsing = re.sub('\\|(.+)', '', parsing)
+        entrySafe += parsing.replace('\n', ' ')
+    entrySafe = entrySafe.replace('<', '')
+    entrySafe = entrySafe.replace('>', '')
+    return entrySafe
+
+# entriesToString before it learned to skip the tree and cache results
+def legacyEntriesToString(entries):
+    if entries is None:
+        return ''
+    holding = ET.Element('body')
+    pythonparser.entriesToXML(holding, entries)
+    output = ''
+    ET.indent(holding, level=0, space='')
+    newLine = ''
+    for ability in ET.tostringlist(holding, 'unicode', 'text'):
+        if ability == '\n':
+            continue
+        output += newLine + ability
+        newLine = pythonparser.newline
+    output = output.replace('<b>', pythonparser.newline)
+    return output.replace('</b>', '')
+
+# parseMonsterSpells before spellsets shared their constant elements, every level and counter built per caster
+def legacyParseMonsterSpells(monsterSpellListXML, spellLists, characterLevel):
+    createNumberTypeElement = pythonparser.createNumberTypeElement
+    createStringTypeElement = pythonparser.createStringTypeElement
+    catalogue = pythonparser.getSpellCatalogue()
+    spellListID = 1
+    for spellList in spellLists:
+        spellEntries = spellList.get('entry')
+        spellIdElement = ET.SubElement(monsterSpellListXML, f'id-{spellListID:05}')
+        createNumberTypeElement(spellIdElement, 'cl', characterLevel)
+        createNumberTypeElement(spellIdElement, 'slotstatmod', 0)
+        spellAttackBonusNumber = 0
+        DCTotalNumber = 10
+        if spellList.get('fp'):
+            createStringTypeElement(spellIdElement, 'castertype', 'points')
+            createNumberTypeElement(spellIdElement, 'powerclass', 1)
+        if spellList.get('type') == 'Spontaneous':
+            createStringTypeElement(spellIdElement, 'castertype', 'spontaneous')
+        createStringTypeElement(spellIdElement, 'label', spellList.get('name'))
+        traditionString = ''
+        if spellList.get('tradition'):
+            traditionString = spellList.get('tradition').lower()
+        createStringTypeElement(spellIdElement, 'tradition', traditionString)
+        if spellList.get('DC'):
+            DCTotalNumber = spellList.get('DC')
+        if spellList.get('attack'):
+            spellAttackBonusNumber = spellList.get('attack')
+        createNumberTypeElement(spellIdElement, 'spellatkbonus', spellAttackBonusNumber)
+        DCElementBody = ET.SubElement(spellIdElement, 'dc')
+        createNumberTypeElement(DCElementBody, 'abilitymod', 0)
+        createNumberTypeElement(DCElementBody, 'item', 0)
+        createNumberTypeElement(DCElementBody, 'misc', DCTotalNumber - 10)
+        createNumberTypeElement(DCElementBody, 'prof', 0)
+        createNumberTypeElement(DCElementBody, 'roll', 0)
+        createNumberTypeElement(DCElementBody, 'rolltempmod', 0)
+        createNumberTypeElement(DCElementBody, 'tempmod', 0)
+        createNumberTypeElement(DCElementBody, 'total', DCTotalNumber)
+        levelsElementBody = ET.SubElement(spellIdElement, 'levels')
+        for level in range(0, 11):
+            countAllSpells = False
+            levelElementBody = ET.SubElement(levelsElementBody, f'level{level}')
+            createNumberTypeElement(levelElementBody, 'level', level)
+            createNumberTypeElement(levelElementBody, 'maxprepared', 0)
+            createNumberTypeElement(levelElementBody, 'totalcast', 0)
+            createNumberTypeElement(levelElementBody, 'totalprepared', 0)
+            spellListEntriesBody = ET.SubElement(levelElementBody, 'spells')
+            availableSpells = 0
+            spellEntry = spellEntries.get(str(level))
+            if spellEntry:
+                if level == 0 and spellEntry.get('level'):
+                    availableSpells = spellEntry.get('level')
+                elif spellEntry.get('slots'):
+                    availableSpells = spellEntry.get('slots')
+                elif spellList.get('type') != 'Prepared':
+                    countAllSpells = True
+                    availableSpells = 1
+                spellFromDataList = spellEntry.get('spells')
+                for i in range(0, len(spellFromDataList)):
+                    notes = ''
+                    spellBase = catalogue.find(spellFromDataList[i].get('name'))
+                    if spellBase is None:
+                        continue
+                    if spellFromDataList[i].get('notes'):
+                        notes = ' ' + pythonparser.listToString(spellFromDataList[i].get('notes'))
+                    if spellFromDataList[i].get('amount'):
+                        notes += ' (' + str(spellFromDataList[i].get('amount')) + ' time(s))'
+                    spellBody = pythonparser.writeSpellsetSpell(spellBase, notes, i + 1, spellListEntriesBody)
+                    preparedAmount = 1
+                    if type(spellFromDataList[i].get('amount')) is int:
+                        preparedAmount = spellFromDataList[i].get('amount')
+                    if spellList.get('type') != 'Focus':
+                        createNumberTypeElement(spellBody, 'prepared', preparedAmount)
+                    if countAllSpells:
+                        availableSpells += preparedAmount
+                    createNumberTypeElement(spellBody, 'cast', 0)
+                    createNumberTypeElement(spellBody, 'spcost', 1)
+            createNumberTypeElement(spellIdElement, f'availablelevel{level}', availableSpells)
+        spellListID += 1
+
+def collectStrings(data, output):
+    if type(data) is str:
+        output.append(data)
+    elif type(data) is list:
+        for value in data:
+            collectStrings(value, output)
+    elif type(data) is dict:
+        for value in data.values():
+            collectStrings(value, output)
+    return output
+
+def collectEntryLists(data, output):
+    # Entry lists that do not embed records, as listToString hands them to entriesToString
+    if type(data) is list:
+        for value in data:
+            collectEntryLists(value, output)
+    elif type(data) is dict:
+        for key, value in data.items():
+            if key == 'entries' and type(value) is list and '"type": "data"' not in json.dumps(value):
+                output.append(value)
+            collectEntryLists(value, output)
+    return output
+
+def loadSublistData(directory):
+    data = []
+    for fileName in sorted(glob.glob(os.path.join(directory, '*-sublist-data.json'))):
+        with open(fileName) as file:
+            data.append(json.load(file))
+    return data
+
+def timeFormatter(formatter, strings, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for string in strings:
+            formatter(string)
+    return time.perf_counter() - start
+
+def benchmarkStringFormatter(strings, repeat):
+    for string in strings:
+        if legacyStringFormatter(string) != pythonparser.stringFormatter(string):
+            print('Output mismatch for: ' + repr(string))
+    total = len(strings) * repeat
+    legacyTime = timeFormatter(legacyStringFormatter, strings, repeat)
+
+    coldTime = timeFormatter(pythonparser.formatTaggedString.__wrapped__, strings, repeat)
+
+    pythonparser.formatTaggedString.cache_clear()
+    warmTime = timeFormatter(pythonparser.stringFormatter, strings, repeat)
+
+    print(f'stringFormatter over {len(strings)} strings x {repeat}')
+    print(f'  before (regex per fragment): {total / legacyTime:12.0f} strings/sec')
+    print(f'  after, no memo hits:         {total / coldTime:12.0f} strings/sec')
+    print(f'  after, memo cache:           {total / warmTime:12.0f} strings/sec')
+
+def benchmarkEntriesToString(entryLists, repeat):
+    for entries in entryLists:
+        if legacyEntriesToString(entries) != pythonparser.entriesToString(entries):
+            print('Output mismatch for: ' + repr(entries))
+    total = len(entryLists) * repeat
+    legacyTime = timeFormatter(legacyEntriesToString, entryLists, repeat)
+
+    def uncachedEntriesToString(entries):
+        pythonparser.entriesTextCache.clear()
+        return pythonparser.entriesToString(entries)
+    uncachedTime = timeFormatter(uncachedEntriesToString, entryLists, repeat)
+
+    pythonparser.entriesTextCache.clear()
+    cachedTime = timeFormatter(pythonparser.entriesToString, entryLists, repeat)
+
+    print(f'entriesToString over {len(entryLists)} entry lists x {repeat}')
+    print(f'  before (tree, indent, tostringlist): {total / legacyTime:10.0f} lists/sec')
+    print(f'  after, no cache hits:                {total / uncachedTime:10.0f} lists/sec')
+    print(f'  after, LRU cache:                    {total / cachedTime:10.0f} lists/sec')
+
+def benchmarkWriters(directory, repeat, traceMemory):
+    # Times each writeSingle* function through convertRecordChunk, the same path the build takes
+    pythonparser.inputPaths = [directory]
+    pythonparser.spellCatalogue = None
+    print(f'{"Writer":<38}{"Records":>10}{"Seconds":>10}{"Records/sec":>14}{"Peak MB":>10}')
+    for categoryKey, (fileName, loader, writeSingle, defaultOptions) in pythonparser.recordCategories.items():
+        if not pythonparser.categoryFiles(categoryKey):
+            continue
+        records = list(loader(pythonparser.categoryFiles(categoryKey)))
+        options = {'createMonsterSpellList' : True} if categoryKey == 'monsters' else {}
+        seconds = None
+        for _ in range(repeat):
+            pythonparser.entriesTextCache.clear()
+            pythonparser.formatTaggedString.cache_clear()
+            start = time.perf_counter()
+            pythonparser.convertRecordChunk(categoryKey, records, options)
+            elapsed = time.perf_counter() - start
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+        peak = ''
+        if traceMemory:
+            # A separate pass, tracemalloc slows the conversion down too much to time it
+            tracemalloc.start()
+            pythonparser.convertRecordChunk(categoryKey, records, options)
+            peak = f'{tracemalloc.get_traced_memory()[1] / 1048576:.1f}'
+            tracemalloc.stop()
+        rate = f'{len(records) / seconds:.0f}' if seconds else ''
+        print(f'{writeSingle.__name__ + " (" + categoryKey + ")":<38}{len(records):>10}{seconds:>10.3f}{rate:>14}{peak:>10}')
+
+def buildSpellsets(builder, casters):
+    spellsets = []
+    for caster in casters:
+        spellsetElement = ET.Element('spellset')
+        builder(spellsetElement, caster.get('spellcasting'), caster.get('level'))
+        spellsets.append(spellsetElement)
+    return spellsets
+
+def benchmarkSpellsets(directory, repeat, traceMemory, casterCount=200):
+    # The heaviest casters of the bestiary, the ones with the most spells over all their spell lists
+    pythonparser.inputPaths = [directory]
+    pythonparser.spellCatalogue = None
+    pythonparser.rootXML = ET.Element('root')
+    pythonparser.libraryEntries = ET.Element('entries')
+    pythonparser.recordSpool = pythonparser.RecordCollector()
+    casters = [creature for creature in pythonparser.iterUniqueRecords(pythonparser.categoryFiles('monsters'), False) if creature.get('spellcasting')]
+    casters.sort(key=lambda creature: -sum(len(levelEntry.get('spells') or []) for casting in creature['spellcasting']
+                                         for levelEntry in (casting.get('entry') or {}).values() if type(levelEntry) is dict))
+    casters = casters[:casterCount]
+    if not casters:
+        print('No spellcasters in ' + directory)
+        return
+    pythonparser.getSpellCatalogue()
+    builders = [('before (built per caster)', legacyParseMonsterSpells), ('after (shared skeletons)', pythonparser.parseMonsterSpells)]
+    outputs = [b''.join(map(pythonparser.serializeRecord, buildSpellsets(builder, casters))) for _, builder in builders]
+    if outputs[0] != outputs[1]:
+        print('Output mismatch between the spellset builders')
+    print(f'parseMonsterSpells over {len(casters)} casters, {len(outputs[1]) / 1024:.0f} KB of spellsets')
+    for name, builder in builders:
+        seconds = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            spellsets = buildSpellsets(builder, casters)
+            elapsed = time.perf_counter() - start
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+        elements = len({id(element) for spellset in spellsets for element in spellset.iter()})
+        peak = ''
+        if traceMemory:
+            del spellsets
+            tracemalloc.start()
+            spellsets = buildSpellsets(builder, casters)
+            peak = f', peak {tracemalloc.get_traced_memory()[1] / 1048576:.1f} MB'
+            tracemalloc.stop()
+        print(f'  {name:<27}{len(casters) / seconds:10.0f} casters/sec, {elements} elements allocated{peak}')
+
+def benchmarkPipeline(directory, jobs, automationFileName=None):
+    # A fresh process per build so the peak RSS only covers that build
+    with tempfile.TemporaryDirectory() as outputDirectory:
+        statsFileName = os.path.join(outputDirectory, 'profile.json')
+        command = [sys.executable, os.path.abspath(pythonparser.__file__), '--accept-license', '-i', directory,
+                   '-o', os.path.join(outputDirectory, 'benchmark.mod'), '-j', str(jobs), '--profile', '--profile-output', statsFileName]
+        if automationFileName:
+            command += ['-a', automationFileName]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        with open(statsFileName) as file:
+            stats = json.load(file)
+        moduleSize = os.path.getsize(os.path.join(outputDirectory, 'benchmark.mod'))
+    records = sum(phase['records'] for name, phase in stats['phases'].items() if name.startswith('convert '))
+    peakKB = stats['peakRSSKB']
+    print(f'writeDBFile pipeline with {jobs} job(s): {records} records in {stats["totalSeconds"]:.2f}s, '
+          f'{records / stats["totalSeconds"]:.0f} records/sec, peak RSS {peakKB / 1024:.1f} MB, module {moduleSize / 1048576:.1f} MB')
+
+def runSuites(directory, arguments):
+    sublistData = loadSublistData(directory)
+    if not sublistData:
+        print('No *-sublist-data.json files found in ' + directory)
+        return
+    if arguments.suite in ('micro', 'all'):
+        benchmarkStringFormatter(collectStrings(sublistData, []), arguments.repeat)
+        benchmarkEntriesToString(collectEntryLists(sublistData, []), arguments.repeat)
+    del sublistData
+    if arguments.suite in ('writers', 'all'):
+        benchmarkWriters(directory, arguments.repeat, not arguments.no_memory)
+    if arguments.suite in ('spellsets', 'all'):
+        benchmarkSpellsets(directory, arguments.repeat, not arguments.no_memory)
+    if arguments.suite in ('pipeline', 'all'):
+        benchmarkPipeline(directory, arguments.jobs, arguments.automation)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for the pf2etools converter')
+    parser.add_argument('directory', nargs='?', default='.', help='folder holding the *-sublist-data.json exports')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--suite', choices=['micro', 'writers', 'spellsets', 'pipeline', 'all'], default='all')
+    parser.add_argument('--synthetic', help='comma separated dataset sizes to generate instead of reading the folder, e.g. 1k,10k,100k')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='worker processes for the pipeline benchmark')
+    parser.add_argument('-a', '--automation', help='automation tracker CSV handed to the pipeline benchmark')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass of the writer benchmark')
+    arguments = parser.parse_args()
+    if arguments.synthetic:
+        for scale in arguments.synthetic.split(','):
+            with tempfile.TemporaryDirectory() as directory:
+                counts = syntheticdata.writeSyntheticExports(directory, syntheticdata.parseScale(scale), arguments.seed)
+                print(f'--- synthetic {scale}: ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
+                runSuites(directory, arguments)
+    else:
+        runSuites(arguments.directory, arguments)
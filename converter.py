@@ -0,0 +1,235 @@
+import collections
+import concurrent.futures
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+
+# pythonparser keeps its conversion state in module globals, every Converter swaps its own state in under this lock.
+# The conversions of one process therefore run one at a time, a ConverterPool runs them side by side in worker processes.
+conversionLock = threading.RLock()
+
+# One converted record: the db.xml category it belongs to ('npc', 'spell', ...) and the serialized record as written there
+RecordFragment = collections.namedtuple('RecordFragment', ['categoryName', 'xml'])
+
+def loadParser():
+    # Imported on first use, so importing this module costs next to nothing
+    import pythonparser
+    return pythonparser
+
+class Converter:
+    # Converts single pf2etools records on demand. Settings, the spell catalogue and the automation effects belong
+    # to the converter and stay warm between calls, so only the records asked for are ever read or converted.
+    def __init__(self, inputPaths=None, moduleName='pf2e_tools', automationFileName=None, createMonsterSpellList=True, stableRecordIDs=False):
+        self.inputPaths = list(inputPaths or ['.'])
+        self.moduleName = moduleName
+        self.automationFileName = automationFileName
+        self.createMonsterSpellList = createMonsterSpellList
+        self.stableRecordIDs = stableRecordIDs
+        self.settings = None
+        self.spellCatalogue = None
+
+    @contextlib.contextmanager
+    def activated(self):
+        with conversionLock:
+            parser = loadParser()
+            savedSettings = parser.getConverterSettings()
+            savedState = (parser.spellCatalogue, parser.automationRows, parser.recordSourceFilter)
+            try:
+                if self.settings is None:
+                    self.settings = dict(savedSettings, moduleName=self.moduleName, automationEffects={}, inputPaths=self.inputPaths,
+                                         categoryInputs={}, stableRecordIDs=self.stableRecordIDs, timeEntryTypes=False, profilingEnabled=False,
+                                         linkTags=False)
+                    parser.applyConverterSettings(self.settings)
+                    parser.automationRows = {}
+                    if self.automationFileName:
+                        # Fills self.settings['automationEffects'], which is the dict applied above
+                        parser.createAutomation(self.automationFileName)
+                        parser.matchAutomationToCreatures(parser.categoryFiles('monsters'))
+                    self.createMonsterSpellList = self.createMonsterSpellList and bool(parser.categoryFiles('spells'))
+                parser.applyConverterSettings(self.settings)
+                parser.spellCatalogue = self.spellCatalogue
+                parser.recordSourceFilter = None
+                yield parser
+            finally:
+                self.spellCatalogue = parser.spellCatalogue
+                parser.applyConverterSettings(savedSettings)
+                parser.spellCatalogue, parser.automationRows, parser.recordSourceFilter = savedState
+
+    def recordOptions(self, parser, categoryKey, options):
+        if categoryKey not in parser.recordCategories:
+            raise ValueError('Unknown category ' + str(categoryKey) + '. Choices: ' + ', '.join(parser.recordCategories))
+        defaultOptions = {'createMonsterSpellList' : self.createMonsterSpellList} if categoryKey == 'monsters' else {}
+        return dict(defaultOptions, **(options or {}))
+
+    def convertRecord(self, categoryKey, record, options=None):
+        # The record first, then the records it embeds (afflictions, nested creatures), numbered from id-00001 per
+        # category unless stable IDs are on, and with recordname links pointing at those IDs
+        with self.activated() as parser:
+            options = self.recordOptions(parser, categoryKey, options)
+            [(categoryOrder, records, usedIDs, embeddedRecords)] = parser.convertRecordChunk(categoryKey, [record], options)
+        return [RecordFragment(categoryName, serializedRecord) for categoryName, serializedRecord in records]
+
+    def convertRecordText(self, categoryKey, record, options=None):
+        # Fantasy Grounds formatted text of the record's description, the first formattedtext field that has content.
+        # The text fields of creatures and hazards are empty placeholders, they get their description and abilities.
+        parser = loadParser()
+        recordXML = parser.ET.fromstring(self.convertRecord(categoryKey, record, options)[0].xml)
+        for field in recordXML:
+            if field.get('type') == 'formattedtext' and any((element.text or '').strip() for element in field.iter()):
+                if not len(field):
+                    return field.text.strip()
+                for element in field:
+                    element.tail = None
+                return b'\n'.join(parser.serializeElement(element) for element in field).decode('utf-8')
+        return self.statBlockText(parser, recordXML)
+
+    def statBlockText(self, parser, recordXML):
+        paragraphs = []
+        description = (recordXML.findtext('description') or '').strip()
+        if description:
+            paragraphs.append(parser.ET.Element('p'))
+            paragraphs[-1].text = description
+        for section in ('actions_interactionabilities', 'actions_offensiveproactive', 'actions_reactiveabilities'):
+            for ability in recordXML.find(section) if recordXML.find(section) is not None else []:
+                paragraphs.append(parser.ET.Element('p'))
+                paragraphs[-1].text = parser.boldString((ability.findtext('name') or '').strip()) + ' ' + (ability.findtext('desc') or '').strip()
+        return b'\n'.join(parser.serializeElement(paragraph) for paragraph in paragraphs).decode('utf-8')
+
+    def formatEntries(self, entries):
+        # An entries list as the single line string used in string fields, paragraphs separated by [newline]
+        with self.activated() as parser:
+            savedState = (parser.rootXML, parser.libraryEntries, parser.recordSpool, parser.idAllocator)
+            try:
+                # Embedded data entries write records, they go into a scratch tree and are dropped
+                parser.rootXML = parser.ET.Element('root')
+                parser.libraryEntries = parser.ET.Element('entries')
+                parser.recordSpool = parser.RecordCollector()
+                parser.idAllocator = parser.IDAllocator(False)
+                return parser.entriesToString(entries)
+            finally:
+                parser.rootXML, parser.libraryEntries, parser.recordSpool, parser.idAllocator = savedState
+
+    def warm(self):
+        # Reads the spell list and the automation sheet now instead of on the first conversion
+        with self.activated() as parser:
+            parser.getSpellCatalogue()
+
+    def cacheReport(self):
+        # The parser's caches are shared by every Converter of the process
+        parser = loadParser()
+        taggedStrings = parser.formatTaggedString.cache_info()
+        return {'formattedStrings' : {'hits' : taggedStrings.hits, 'misses' : taggedStrings.misses, 'size' : taggedStrings.currsize},
+                'entriesText' : {'size' : len(parser.entriesTextCache)}}
+
+    def buildModule(self, recordsByCategory, output, name=None, compressionLevel=None):
+        # Writes a .mod of the given records, category key -> list of records, to a path or a binary file object.
+        # Creature spellsets use the posted spells when there are any and the converter's spell list otherwise.
+        with self.activated() as parser:
+            for categoryKey, records in recordsByCategory.items():
+                self.recordOptions(parser, categoryKey, None)
+                if type(records) is not list or not all(type(record) is dict for record in records):
+                    raise ValueError(categoryKey + ' must be a list of record objects')
+            if 'spells' not in recordsByCategory:
+                parser.getSpellCatalogue()
+            with tempfile.TemporaryDirectory() as directory:
+                for categoryKey, records in recordsByCategory.items():
+                    with open(os.path.join(directory, parser.recordCategories[categoryKey][0]), 'w', encoding='utf-8') as file:
+                        json.dump(records, file)
+                parser.inputPaths = [directory]
+                parser.moduleName = name or self.moduleName
+                if 'spells' in recordsByCategory:
+                    parser.spellCatalogue = None
+                selectedCategories = [(categoryKey, self.recordOptions(parser, categoryKey, None)) for categoryKey in parser.recordCategories
+                                      if categoryKey in recordsByCategory]
+                try:
+                    parser.writeModule(parser.moduleName, compressionLevel, selectedCategories, output, quiet=True)
+                except ValueError as error:
+                    # The posted records are files in the scratch directory now, callers should not see where it is
+                    raise ValueError(str(error).replace(os.path.join(directory, ''), '')) from error
+                finally:
+                    parser.spellCatalogue = self.spellCatalogue
+
+    def categoryRecords(self, categoryKey):
+        # Streams a category from the converter's input folders, the lock is not held while the files are read
+        with self.activated() as parser:
+            self.recordOptions(parser, categoryKey, None)
+            fileNames = parser.categoryFiles(categoryKey)
+            if categoryKey == 'spells':
+                return parser.getSpellCatalogue().spells
+            return parser.iterUniqueRecords(fileNames, False)
+
+    def iterConvert(self, categoryKey, records=None, options=None):
+        # Yields (record, fragments) one record at a time, records defaults to the category's exports in inputPaths
+        if records is None:
+            records = self.categoryRecords(categoryKey)
+        for record in records:
+            yield record, self.convertRecord(categoryKey, record, options)
+
+# The Converter of a ConverterPool worker process
+workerConverter = None
+
+def startWorker(converterArguments):
+    global workerConverter
+    workerConverter = Converter(**converterArguments)
+    workerConverter.warm()
+
+def runInWorker(function, *args):
+    # The pool keeps the cache figures of every worker for its cacheReport
+    return function(workerConverter, *args), os.getpid(), workerConverter.cacheReport()
+
+def moduleBytes(pf2eConverter, recordsByCategory, name, compressionLevel):
+    output = io.BytesIO()
+    pf2eConverter.buildModule(recordsByCategory, output, name, compressionLevel)
+    return output.getvalue()
+
+class ConverterPool:
+    # A Converter in each of several worker processes, so conversions run side by side instead of waiting on
+    # conversionLock. Module builds take at most all but one worker, single records are never stuck behind them.
+    # Takes the arguments of Converter.
+    def __init__(self, workers=2, **converterArguments):
+        # Workers are started fresh instead of forked from a process that is serving requests on other threads
+        self.executor = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=startWorker,
+                                                             initargs=(converterArguments,))
+        self.moduleBuilds = threading.BoundedSemaphore(max(1, workers - 1))
+        self.lock = threading.Lock()
+        # Worker process ID -> its last cacheReport
+        self.cacheReports = {}
+
+    def run(self, function, *args):
+        result, workerID, cacheReport = self.executor.submit(runInWorker, function, *args).result()
+        with self.lock:
+            self.cacheReports[workerID] = cacheReport
+        return result
+
+    def convertRecord(self, categoryKey, record, options=None):
+        return self.run(Converter.convertRecord, categoryKey, record, options)
+
+    def convertRecordText(self, categoryKey, record, options=None):
+        return self.run(Converter.convertRecordText, categoryKey, record, options)
+
+    def formatEntries(self, entries):
+        return self.run(Converter.formatEntries, entries)
+
+    def buildModule(self, recordsByCategory, output, name=None, compressionLevel=None):
+        with self.moduleBuilds:
+            module = self.run(moduleBytes, recordsByCategory, name, compressionLevel)
+        if hasattr(output, 'write'):
+            output.write(module)
+        else:
+            with open(output, 'wb') as file:
+                file.write(module)
+
+    def cacheReport(self):
+        # The caches of the workers that answered so far, added up
+        with self.lock:
+            reports = list(self.cacheReports.values())
+        formattedStrings = {key : sum(report['formattedStrings'][key] for report in reports) for key in ('hits', 'misses', 'size')}
+        return {'formattedStrings' : formattedStrings, 'entriesText' : {'size' : sum(report['entriesText']['size'] for report in reports)},
+                'workers' : len(reports)}
+
+    def close(self):
+        self.executor.shutdown()
@@ -1,11 +1,55 @@
+import argparse
+import collections
+import concurrent.futures
+import cProfile
+import csv
+import difflib
+import functools
+import glob
+import hashlib
+import itertools
 import json
 import os
 import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
 import xml.etree.ElementTree as ET
 import zipfile
-import csv
+import zlib
+
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import ijson
+    # use_float, which gives the same floats as json instead of Decimals, came with ijson 3.1
+    if tuple(int(part) for part in re.findall(r'\d+', getattr(ijson, '__version__', '0'))[:2]) < (3, 1):
+        ijson = None
+except ImportError:
+    ijson = None
 
 moduleName = 'pf2e_tools'
+# 0 stores the module files uncompressed, 1-9 deflates them
+moduleCompressionLevel = 6
+keepIntermediateFiles = False
+conversionJobs = 1
+# Folders or glob patterns searched for the exports of every category
+inputPaths = ['.']
+# Category key -> extra glob patterns, e.g. homebrew files that do not follow the export naming
+categoryInputs = {}
+# Set of source books to keep while building one shard of a split build, None keeps every record
+recordSourceFilter = None
+automationFileName = 'PF2 Bestiary 1 - Automation tracker - Creatures.csv'
+recordCachePath = None
+# JSONLinesSink / SQLiteSink objects that get every record as it is read, next to the module
+recordSinks = []
+recordsPerChunk = 250
+# Bytes of records a category keeps in memory before its spool moves to a temporary file
+recordSpoolMemory = 16 * 1024 * 1024
 typeString = {'type': 'string'}
 typeFormattedText = {'type': 'formattedtext'}
 staticModifier = {'static' : 'true'}
@@ -17,57 +61,457 @@ newline = '[newline]'
 libraryNameKeys = {'trait' : 'Traits', 'npc' : 'Bestiary', 'story' : 'Story', 'affliction' : 'Afflictions', 'feat' : 'Feats', 'background' : 'Backgrounds', 'spell' : 'Spells', 'item' : 'Items'}
 rootXML = None
 libraryEntries = None
+recordSpool = None
+recordIndentation = '  '
 damageTypeKey = {'S' : 'slashing', 'P' : 'piercing', 'B' : 'bludgeoning', 'modular' : 'slashing, piercing, or bludgeoning'}
 savingThrowShortToLong = {'W' : 'Will', 'R' : 'Reflex', 'F' : 'Fortitude'}
 
 categoryElementTag = {'name': moduleName}
 
-npcID = 1
-spellID = 1
-afflictionID = 1
-backgroundID = 1
-featID = 1
-itemID = 1
-traitID = 1
+idCategories = ('npc', 'spell', 'affliction', 'background', 'feat', 'item', 'trait')
+# Number of IDs stable record IDs are spread over, they are written as id-000001 up to id-999999
+stableIDSpace = 999999
+stableRecordIDs = False
 
+# 'creature|ability' with both names normalized -> automation string
 automationEffects = {}
-
-def createAutomation():
-    global automationEffects
-    with open('PF2 Bestiary 1 - Automation tracker - Creatures.csv', 'r') as automationFile:
+# Same keys -> the creature and ability names as written in the sheet, used to report rows that match nothing
+automationRows = {}
+spellCatalogue = None
+# Tags naming a record give the converted record a placeholder for a link to it, off converts tags to plain text only
+linkTags = False
+# ReferenceIndex of the records merged so far while a module is built
+referenceIndex = None
+entriesTextCache = collections.OrderedDict()
+entriesTextCacheSize = 4096
+entryTypeRenderers = {}
+# Entry type -> [rendered count, seconds spent including nested entries]
+entryTypeStats = {}
+timeEntryTypes = False
+profilingEnabled = False
+# Phase name -> [seconds, records, KB the phase raised the process's peak resident memory by], nested phases excluded
+phaseStats = {}
+# PhaseTimers running right now, the innermost last
+activePhases = []
+
+def categoryFiles(categoryKey):
+    # The export itself plus copies like 'bestiary-sublist-data (1).json', the plain name first
+    fileName = recordCategories[categoryKey][0]
+    stem = fileName[:-len('.json')]
+    files = []
+    for inputPath in inputPaths:
+        if os.path.isdir(inputPath):
+            matches = glob.glob(os.path.join(glob.escape(inputPath), glob.escape(stem) + '*.json'))
+        else:
+            matches = [match for match in glob.glob(inputPath) if os.path.basename(match).startswith(stem)]
+        files.extend(sorted(matches, key=lambda match: (os.path.basename(match) != fileName, match)))
+    for pattern in categoryInputs.get(categoryKey, []):
+        files.extend(sorted(glob.glob(pattern)))
+    uniqueFiles = []
+    for fileName in files:
+        if os.path.abspath(fileName) not in map(os.path.abspath, uniqueFiles):
+            uniqueFiles.append(fileName)
+    return uniqueFiles
+
+def recordSource(record):
+    return str(record.get('source') or 'Other')
+
+def recordIdentity(record):
+    return (str(record.get('name')).casefold(), record.get('source'), record.get('add_hash'))
+
+def iterUniqueRecords(fileNames, reportDuplicates=True):
+    # The first export wins when books or homebrew files repeat a record
+    seen = set()
+    duplicates = 0
+    for fileName in fileNames:
+        for record in iterJSONArray(fileName):
+            identity = recordIdentity(record)
+            if identity in seen:
+                duplicates += 1
+                continue
+            seen.add(identity)
+            yield record
+    if duplicates and reportDuplicates:
+        print('Skipped ' + str(duplicates) + ' duplicate records in ' + ', '.join(fileNames))
+
+def resourcePath(fileName):
+    # License texts are looked up in the working folder first, then next to this script
+    if os.path.exists(fileName):
+        return fileName
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), fileName)
+
+@functools.lru_cache(16384)
+def normalizeAutomationName(name):
+    # Case, punctuation and spacing differences between the sheet and pf2etools do not matter
+    return ' '.join(re.sub(r'[^\w]+', ' ', str(name or '').casefold()).split())
+
+def automationKey(creatureName, abilityName):
+    return normalizeAutomationName(creatureName) + '|' + normalizeAutomationName(abilityName)
+
+def automationIndexPath(fileName):
+    return fileName + '.index'
+
+def readAutomationIndex(fileName):
+    # The normalized index is kept next to the sheet and reused while the sheet is unchanged
+    stamp = [os.path.getsize(fileName), os.stat(fileName).st_mtime_ns]
+    try:
+        with open(automationIndexPath(fileName), 'rb') as file:
+            index = json.loads(zlib.decompress(file.read()))
+        if index.get('stamp') == stamp:
+            return index.get('effects'), index.get('rows')
+    except (OSError, ValueError, zlib.error):
+        pass
+    effects = {}
+    rows = {}
+    with open(fileName, 'r', newline='') as automationFile:
         automationReader = csv.reader(automationFile)
         # Gets rid of the first line
+        next(automationReader, None)
         creatureName = ''
         # Creates a look up table
         for line in automationReader:
-            if line[0]:
+            if line and line[0]:
                 creatureName = line[0]
-            if not automationEffects.get(creatureName):
-                automationEffects[creatureName] = {}
-            automationEffects[creatureName].update({line[3] : line[5]})
+            if len(line) < 6 or not line[3]:
+                continue
+            key = automationKey(creatureName, line[3])
+            effects[key] = line[5]
+            rows[key] = [creatureName, line[3]]
+    try:
+        with open(automationIndexPath(fileName), 'wb') as file:
+            file.write(zlib.compress(json.dumps({'stamp' : stamp, 'effects' : effects, 'rows' : rows}, separators=(',', ':')).encode('utf-8')))
+    except OSError:
+        pass
+    return effects, rows
+
+def createAutomation(fileName=None):
+    if fileName is None:
+        fileName = automationFileName
+    effects, rows = readAutomationIndex(fileName)
+    automationEffects.update(effects)
+    automationRows.update(rows)
+
+parentheticalSuffixPattern = re.compile(r'\s*\([^()]*\)\s*$')
+
+def automationNameVariants(name, addHash=None):
+    # Spellings of one name that only differ by a parenthetical suffix or by the record's add_hash,
+    # "Goblin Warrior (Elite)" and "Goblin Warrior" with add_hash Elite
+    name = str(name or '')
+    variants = {normalizeAutomationName(name), normalizeAutomationName(parentheticalSuffixPattern.sub('', name))}
+    if addHash:
+        variants.add(normalizeAutomationName(name + ' ' + str(addHash)))
+    return variants
+
+class AutomationNames:
+    # The creature or ability names of the bestiary, normalized name -> name as exported
+    def __init__(self):
+        self.names = {}
+        self.variants = {}
+
+    def add(self, name, addHash=None):
+        key = normalizeAutomationName(name)
+        self.names.setdefault(key, name)
+        for variant in automationNameVariants(name, addHash):
+            self.variants.setdefault(variant, set()).add(key)
+        return key
+
+    def match(self, name):
+        # Same name, or the only exported name that differs from it by a suffix alone. Names that are merely
+        # spelled alike are different creatures and abilities, Young Blue Dragon is not Young Brine Dragon.
+        key = normalizeAutomationName(name)
+        if key in self.names:
+            return key
+        candidates = set()
+        for variant in automationNameVariants(name):
+            candidates.update(self.variants.get(variant, ()))
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def closest(self, name):
+        closeMatches = difflib.get_close_matches(normalizeAutomationName(name), self.names, 1, 0.8)
+        return self.names[closeMatches[0]] if closeMatches else None
+
+def matchAutomationToCreatures(fileNames, reportFileName=None):
+    # One pass over the bestiary: rows naming a creature or ability with another suffix get an extra key,
+    # rows matching nothing are reported with the closest exported name as a suggestion
+    if not automationRows:
+        return []
+    creatures = AutomationNames()
+    creatureAbilities = {}
+    for creature in iterUniqueRecords(fileNames, False):
+        abilities = creatureAbilities.setdefault(creatures.add(creature.get('name'), creature.get('add_hash')), AutomationNames())
+        for section in ('abilitiesTop', 'abilitiesMid', 'abilitiesBot'):
+            for ability in creature.get(section) or []:
+                if type(ability) is dict and ability.get('name'):
+                    abilities.add(ability.get('name'))
+    unmatchedRows = []
+    suffixMatches = 0
+    for key, (creatureName, abilityName) in automationRows.items():
+        matchedCreature = creatures.match(creatureName)
+        if matchedCreature is None:
+            unmatchedRows.append((creatureName, abilityName, creatures.closest(creatureName) or ''))
+            continue
+        abilities = creatureAbilities[matchedCreature]
+        matchedAbility = abilities.match(abilityName)
+        if matchedAbility is None:
+            closestAbility = abilities.closest(abilityName)
+            unmatchedRows.append((creatureName, abilityName, creatures.names[matchedCreature] + ': ' + closestAbility if closestAbility else ''))
+            continue
+        matchedKey = matchedCreature + '|' + matchedAbility
+        if matchedKey != key:
+            # The same creature and ability written with another suffix, a row naming them exactly wins
+            automationEffects.setdefault(matchedKey, automationEffects[key])
+            suffixMatches += 1
+    print(f'Automation: {len(automationRows) - len(unmatchedRows)} rows matched ({suffixMatches} by a suffix or add_hash), {len(unmatchedRows)} did not match any creature ability')
+    for creatureName, abilityName, suggestion in unmatchedRows[:10]:
+        print('  ' + creatureName + ': ' + abilityName + (' (closest: ' + suggestion + ')' if suggestion else ''))
+    if len(unmatchedRows) > 10:
+        print('  ...')
+    if reportFileName:
+        with open(reportFileName, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Creature', 'Ability', 'Closest exported'])
+            writer.writerows(unmatchedRows)
+    return unmatchedRows
+
+class SpellCatalogue:
+    def __init__(self, fileNames=('spells-sublist-data.json',)):
+        self.fileNames = [fileName for fileName in fileNames if os.path.exists(fileName)]
+        self.nameIndex = {}
+        # Spell identity -> the rendered children of a spellset spell after its name, None when it cannot be shared
+        self.spellsetFragments = {}
+        self.spells = list(iterUniqueRecords(self.fileNames))
+        # Real names always win over aliases, later duplicates replace earlier ones
+        for spell in self.spells:
+            if spell.get('name') is not None:
+                self.nameIndex[spell.get('name').casefold()] = spell
+        for spell in self.spells:
+            for alias in self.aliasesForSpell(spell):
+                self.nameIndex.setdefault(alias.casefold(), spell)
+
+    def aliasesForSpell(self, spell):
+        aliases = []
+        name = spell.get('name')
+        if name is None:
+            return aliases
+        if spell.get('add_hash'):
+            aliases.append(name + ' (' + str(spell.get('add_hash')) + ')')
+        if spell.get('alias'):
+            aliases.extend(spell.get('alias'))
+        return aliases
+
+    def find(self, name):
+        if name is None:
+            return None
+        return self.nameIndex.get(name.casefold())
+
+def getSpellCatalogue():
+    global spellCatalogue
+    if spellCatalogue is None:
+        spellCatalogue = SpellCatalogue(categoryFiles('spells'))
+    return spellCatalogue
+
+# Tag name -> category key of the records it names, the text its links start with and the window class they open.
+# Conditions are not exported as records, {@condition} tags stay plain text.
+linkedTags = {
+    'spell' : ('spells', 'Spell', 'spelldesc'),
+    'ritual' : ('rituals', 'Ritual', 'spelldesc'),
+    'item' : ('items', 'Item', 'item'),
+    'feat' : ('feats', 'Feat', 'reference_feat'),
+    'trait' : ('traits', 'Trait', 'reference_trait'),
+    'background' : ('backgrounds', 'Background', 'reference_background'),
+    'creature' : ('monsters', 'NPC', 'npc'),
+    'hazard' : ('hazards', 'Hazard', 'npc'),
+}
+linkedTagPattern = re.compile(r'{@(\w+) ([^}]*)}')
+# Placeholder for the links of a converted record, replaced by a linklist once the records the tags name are merged
+linkListPattern = re.compile(rb'\n( *)<linklist (?:field="(\w+)" )?links="([0-9a-f/ ]*)" />')
+# Links between the records of one converted record
+recordLinkPattern = re.compile(rb'recordname="(\w+)\.id-(\d+)"')
+
+def tagLinkKey(tagName, name, source=''):
+    # A digest keeps names with quotes or ampersands out of the placeholder attribute
+    return hashlib.sha1(json.dumps([tagName, name, source]).encode('utf-8')).hexdigest()[:16]
+
+@functools.lru_cache(maxsize=65536)
+def tagLinkEntries(s):
+    # The link keys of the tags in s that can name a record. {@spell fireball|CRB||the spell} prefers Fireball from CRB
+    # and falls back on any Fireball, its entry is 'sourced key/name key'.
+    entries = []
+    for tagName, text in linkedTagPattern.findall(s):
+        if tagName not in linkedTags:
+            continue
+        name, _, rest = text.partition('|')
+        name = name.strip().casefold()
+        source = rest.partition('|')[0].strip().casefold()
+        nameKey = tagLinkKey(tagName, name)
+        entries.append(tagLinkKey(tagName, name, source) + '/' + nameKey if source else nameKey)
+    return tuple(entries)
+
+class ReferenceIndex:
+    # The records of the module tags can link to, filled in while the records are merged. A converted record only holds
+    # the keys of its tags, so it does not depend on the rest of the module, and gets its links when their targets are known.
+    def __init__(self):
+        # Link key -> (link text, recordname, window class, link text as XML) of the first record merged under that key
+        self.targets = {}
+        # Category key -> (tag name, link text prefix, window class) of the tags naming its records
+        self.categoryTags = {}
+        for tagName, (categoryKey, label, linkClass) in linkedTags.items():
+            self.categoryTags.setdefault(categoryKey, []).append((tagName, label, linkClass))
+
+    def add(self, categoryKey, record, recordName):
+        name = record.get('name')
+        if name is None:
+            return
+        for tagName, label, linkClass in self.categoryTags.get(categoryKey, ()):
+            text = label + ': ' + name
+            target = (text, recordName, linkClass.encode(), formatXMLText(text).encode('utf-8'))
+            self.targets.setdefault(tagLinkKey(tagName, name.casefold()), target)
+            self.targets.setdefault(tagLinkKey(tagName, name.casefold(), str(record.get('source')).casefold()), target)
+
+    def linkList(self, match, ownName=None):
+        # The linklist a linkListPattern match stands for and whether it is final. While the records are merged, ownName
+        # is the record's own recordname and a link that a later record could still change keeps the placeholder, minus
+        # the tags naming the record itself. Once every record is merged a tag naming no record is dropped.
+        indentation, fieldName, entries = match.groups()
+        targets = {}
+        pendingEntries = []
+        final = True
+        for entry in entries.decode().split():
+            sourcedKey, _, nameKey = entry.rpartition('/')
+            target = self.targets.get(sourcedKey) if sourcedKey else None
+            if target is None and (ownName is None or not sourcedKey):
+                target = self.targets.get(nameKey)
+            if target is None and ownName is not None:
+                # Only the first record merged under a key is linked, the record with the named source may still come
+                fallback = self.targets.get(nameKey)
+                final = False
+                pendingEntries.append(sourcedKey + '/' if fallback is not None and fallback[1] == ownName else entry)
+            elif target is not None and target[1] != ownName:
+                targets[target[1]] = target
+                pendingEntries.append(entry)
+        if not final:
+            placeholder = b'\n' + indentation + b'<linklist ' + (b'field="' + fieldName + b'" ' if fieldName else b'')
+            return placeholder + b'links="' + ' '.join(pendingEntries).encode() + b'" />', False
+        if not targets:
+            return b'', True
+        step = recordIndentation.encode()
+        listIndentation = indentation + step if fieldName else indentation
+        lines = [listIndentation + b'<linklist>']
+        for text, recordName, linkClass, xmlText in sorted(targets.values(), key=lambda target: target[:2]):
+            lines.append(listIndentation + step + b'<link class="' + linkClass + b'" recordname="' + recordName + b'">' + xmlText + b'</link>')
+        lines.append(listIndentation + b'</linklist>')
+        if fieldName:
+            lines = [indentation + b'<' + fieldName + b' type="formattedtext">', *lines, indentation + b'</' + fieldName + b'>']
+        return b'\n' + b'\n'.join(lines), True
+
+def noteReferences(s):
+    # Remembers the tags in s that can name a record, the record being converted gets links to the ones that do
+    if linkTags and '{@' in s:
+        idAllocator.references.update(tagLinkEntries(s))
+
+def linkReferences():
+    # Adds the placeholder of the links to the records the converted record's tags name to its first formatted text field,
+    # records without one get a links field of their own. The placeholder is dropped when the tags name no record.
+    record = getCategory(rootXML[0])[0]
+    field = next((field for field in record if field.get('type') == 'formattedtext'), None)
+    links = ' '.join(sorted(idAllocator.references))
+    if field is None:
+        ET.SubElement(record, 'linklist', {'field' : 'links', 'links' : links})
+    else:
+        ET.SubElement(field, 'linklist', {'links' : links})
+
+tagSplitter = re.compile('{|}')
+actionTagPattern = re.compile(r'(@as+)\s')
+tagNamePattern = re.compile(r'@([a-zA-Z]+)\s')
+pipeSuffixPattern = re.compile(r'\|(.+)')
+
+def renderTagFragment(fragment):
+    # Handles one piece of {@tag text|source||display} markup, or the plain text around it
+    if '@' in fragment:
+        if actionTagPattern.search(fragment) is not None:
+            return actionParser[fragment[-1]]
+        fragment = tagNamePattern.sub('', fragment)
+    if '|' in fragment:
+        if '||' in fragment:
+            fragment = fragment.split('||')[1]
+        fragment = pipeSuffixPattern.sub('', fragment)
+    return fragment
+
+@functools.lru_cache(maxsize=65536)
+def formatTaggedString(s):
+    if '{' in s or '}' in s:
+        output = ''.join([renderTagFragment(fragment) for fragment in tagSplitter.split(s)])
+    else:
+        output = renderTagFragment(s)
+    output = output.replace('\n', ' ')
+    if '<' in output or '>' in output:
+        output = output.replace('<', '').replace('>', '')
+    return output
+
+def peakMemoryKB(who=None):
+    # Of this process, or with resource.RUSAGE_CHILDREN of the largest worker process that has exited
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def buildPeakMemoryKB():
+    return max(peakMemoryKB(), peakMemoryKB(resource.RUSAGE_CHILDREN) if resource is not None else 0)
+
+def addPhaseStats(name, seconds, records=0, peakGrowthKB=0):
+    stats = phaseStats.setdefault(name, [0.0, 0, 0])
+    stats[0] += seconds
+    stats[1] += records
+    stats[2] += peakGrowthKB
+
+def mergePhaseStats(stats):
+    for name, (seconds, records, peakGrowthKB) in stats.items():
+        addPhaseStats(name, seconds, records, peakGrowthKB)
+
+class PhaseTimer:
+    # Adds the time spent in a with block to phaseStats when profiling is on. A phase inside another one, like the
+    # spellsets of a creature, is only counted for itself, the outer phase gets its time and memory growth without it.
+    # ru_maxrss only ever grows, so a phase is charged with how far it raised the process's peak, not with the peak.
+    def __init__(self, name, records=0):
+        self.name = name
+        self.records = records
+
+    def __enter__(self):
+        if profilingEnabled:
+            self.nestedSeconds = 0.0
+            self.nestedPeakGrowthKB = 0
+            self.startPeakKB = peakMemoryKB()
+            activePhases.append(self)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        if profilingEnabled:
+            seconds = time.perf_counter() - self.start
+            peakGrowthKB = peakMemoryKB() - self.startPeakKB
+            activePhases.pop()
+            if activePhases:
+                activePhases[-1].nestedSeconds += seconds
+                activePhases[-1].nestedPeakGrowthKB += peakGrowthKB
+            addPhaseStats(self.name, seconds - self.nestedSeconds, self.records, peakGrowthKB - self.nestedPeakGrowthKB)
+
+def phaseStatsReport(totalSeconds):
+    lines = [f'{"Phase":<28}{"Seconds":>10}{"Records":>10}{"Records/sec":>14}{"Peak RSS +MB":>14}']
+    for name, (seconds, records, peakGrowthKB) in phaseStats.items():
+        rate = f'{records / seconds:.0f}' if records and seconds else ''
+        lines.append(f'{name:<28}{seconds:>10.3f}{records or "":>10}{rate:>14}{peakGrowthKB / 1024:>14.1f}')
+    lines.append(f'{"total wall time":<28}{totalSeconds:>10.3f}{"":>10}{"":>14}{"":>14}')
+    lines.append(f'Nested phases are not counted in the phase around them. Peak RSS +MB is how far a phase raised the process\'s peak, '
+                 f'the largest process peaked at {buildPeakMemoryKB() / 1024:.1f} MB.')
+    return '\n'.join(lines)
 
 def stringFormatter(s):
     if s is None:
         return ''
     if type(s) is int:
         return str(s)
-    entryRaw = s
-    entrySafe = ''
-    for split in re.split('{|}', entryRaw):
-        parsing = split
-        if re.search('(@as+)\s', parsing) is not None:
-            stringEnding = split[len(split) - 1]
-            parsing = actionParser[str(stringEnding)]
-        else:
-            parsing = re.sub('@([a-zA-Z]+)\s', '', parsing)
-            if parsing.find('||') != -1:
-                parsing = re.split('\|\|', parsing)[1]
-            parsing = re.sub('\|(.+)', '', parsing)
-        entrySafe += parsing.replace('\n', ' ')
-    entrySafe = entrySafe.replace('<', '')
-    entrySafe = entrySafe.replace('>', '')
-
-    return entrySafe
+    noteReferences(s)
+    return formatTaggedString(s)
 
 
 def activityToString(activity, isSymbol=True):
@@ -107,55 +551,112 @@ def entriesToXML(parentXML, entries, skipTypes=[]):
             entryTypeToXML(parentXML, entry, entryType)
 
 def entryTypeToXML(parentXML, entry, entryType):
-    if entryType == 'successDegree' or entryType == 'suceessDegree':
-        successDegreeToXML(parentXML, entry.get('entries'))
-    elif entryType == 'list':
-        listToXML(parentXML, entry.get('items'))
-    elif entryType == 'table':
-        tableToXML(parentXML, entry.get('rows'), entry.get('footnotes') if 'footnotes' in entry else '')
-    elif entryType == 'ability':
-        abilityToXML(parentXML, entry)
-    elif entryType == 'pf2-options':
-        pf2_optionsToXML(parentXML, entry.get('items'))
-    elif entryType == 'hr':
-        hrToXML(parentXML, entry.get('entries'))
-    elif entryType == 'affliction':
-        afflictionToXML(parentXML, entry)
-    elif entryType == 'lvlEffect':
-        lvlEffectToXML(parentXML, entry.get('entries'))
-    elif entryType == 'item':
-        itemEntryTypeToXML(parentXML, entry.get('entries'))
-    elif entryType == 'pf2-sample-box':
-        pf2SampleBoxToXML(parentXML, entry)
-    elif entryType == 'pf2-brown-box':
-        pf2SampleBoxToXML(parentXML, entry)
-    elif entryType == 'statblock':
-        return
-    elif entryType == 'attack':
-        createStringTypeElement(parentXML, 'p', attackStringFromAttacks([entry], entry.get('range')))
-    elif entryType == 'data':
-        dataEntryType(parentXML, entry)
-    elif entryType == 'pf2-h4':
-        pf2SampleBoxToXML(parentXML, entry)
-    else:
+    renderer = entryTypeRenderers.get(entryType)
+    stats = entryTypeStats.get(entryType)
+    if stats is None:
+        stats = entryTypeStats[entryType] = [0, 0.0]
+    stats[0] += 1
+    if renderer is None:
         print('Unhandled Entry type: ' + str(entry.get('type')))
+    elif timeEntryTypes:
+        start = time.perf_counter()
+        renderer(parentXML, entry)
+        stats[1] += time.perf_counter() - start
+    else:
+        renderer(parentXML, entry)
+
+def registerEntryType(entryType, renderer):
+    # renderer(parentXML, entry) appends the XML for one entry of that type
+    entryTypeRenderers[entryType] = renderer
+
+def mergeEntryTypeStats(stats):
+    for entryType, (count, seconds) in stats.items():
+        totals = entryTypeStats.setdefault(entryType, [0, 0.0])
+        totals[0] += count
+        totals[1] += seconds
+
+def entryTypeStatsReport():
+    lines = [f'{"Entry type":<20}{"Count":>10}{"Seconds":>12}']
+    for entryType, (count, seconds) in sorted(entryTypeStats.items(), key=lambda item: (-item[1][1], -item[1][0])):
+        handled = '' if entryType in entryTypeRenderers else '  (unhandled)'
+        lines.append(f'{str(entryType):<20}{count:>10}{seconds:>12.3f}{handled}')
+    return '\n'.join(lines)
+
+registerEntryType('successDegree', lambda parentXML, entry: successDegreeToXML(parentXML, entry.get('entries')))
+registerEntryType('suceessDegree', lambda parentXML, entry: successDegreeToXML(parentXML, entry.get('entries')))
+registerEntryType('list', lambda parentXML, entry: listToXML(parentXML, entry.get('items')))
+registerEntryType('table', lambda parentXML, entry: tableToXML(parentXML, entry.get('rows'), entry.get('footnotes') if 'footnotes' in entry else ''))
+registerEntryType('ability', lambda parentXML, entry: abilityToXML(parentXML, entry))
+registerEntryType('pf2-options', lambda parentXML, entry: pf2_optionsToXML(parentXML, entry.get('items')))
+registerEntryType('hr', lambda parentXML, entry: hrToXML(parentXML, entry.get('entries')))
+registerEntryType('affliction', lambda parentXML, entry: afflictionToXML(parentXML, entry))
+registerEntryType('lvlEffect', lambda parentXML, entry: lvlEffectToXML(parentXML, entry.get('entries')))
+registerEntryType('item', lambda parentXML, entry: itemEntryTypeToXML(parentXML, entry.get('entries')))
+registerEntryType('pf2-sample-box', lambda parentXML, entry: pf2SampleBoxToXML(parentXML, entry))
+registerEntryType('pf2-brown-box', lambda parentXML, entry: pf2SampleBoxToXML(parentXML, entry))
+registerEntryType('statblock', lambda parentXML, entry: None)
+registerEntryType('attack', lambda parentXML, entry: createStringTypeElement(parentXML, 'p', attackStringFromAttacks([entry], entry.get('range'))))
+registerEntryType('data', lambda parentXML, entry: dataEntryType(parentXML, entry))
+registerEntryType('pf2-h4', lambda parentXML, entry: pf2SampleBoxToXML(parentXML, entry))
 
 def dataEntryType(parentXML, entry):
     linked = ET.SubElement(parentXML, 'linklist')
     subLink = ET.SubElement(linked, 'link')
     data = {}
     if entry.get('tag') == 'creature':
-        id = writeSingleMonster(entry.get('data'), True)
+        id = writeEmbeddedRecord('npc', entry.get('data'))
         data = {'class': 'npc', 'recordname': 'npc.'+ intToId(id)}
         subLink.text = 'NPC: ' + entry.get('data').get('name')
     elif entry.get('tag') == 'affliction':
-        id = writeSingleAffliction(entry.get('data'))
+        id = writeEmbeddedRecord('affliction', entry.get('data'))
         data = {'class' : getClassName('affliction'), 'recordname' : 'affliction.' + intToId(id)}
         subLink.text = 'Affliction: ' + entry.get('data').get('name')
     else:
         print('Unhandled Data Entry type: ' + entry.get('tag'))
     subLink.attrib = data
 
+def embeddedRecordKey(categoryName, data):
+    # The identity plus a digest of the data, two different stat blocks sharing a name stay two records
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')).hexdigest()
+    return '|'.join([categoryName, *map(str, recordIdentity(data)), digest])
+
+def embeddedRecordKeys(value, keys):
+    # Adds the embeddedRecordKey of every creature and affliction embedded in an export record to keys
+    if type(value) is dict:
+        data = value.get('data')
+        if value.get('type') == 'data' and type(data) is dict and value.get('tag') in ('creature', 'affliction'):
+            keys.append(embeddedRecordKey('npc' if value['tag'] == 'creature' else 'affliction', data))
+        for item in value.values():
+            if type(item) is dict or type(item) is list:
+                embeddedRecordKeys(item, keys)
+    elif type(value) is list:
+        for item in value:
+            if type(item) is dict or type(item) is list:
+                embeddedRecordKeys(item, keys)
+    return keys
+
+def writeEmbeddedRecord(categoryName, data):
+    # A creature or affliction embedded again in the same record links to the one already written. One an earlier
+    # record of the build writes is not converted at all, its ID stands in until the merge links it to that copy.
+    key = embeddedRecordKey(categoryName, data)
+    written = idAllocator.embeddedRecords.get(key)
+    if written is not None:
+        return written[1]
+    identity, ordinals = idAllocator.identity, idAllocator.ordinals
+    if identity is not None:
+        idAllocator.identity, idAllocator.ordinals = key, dict.fromkeys(idCategories, 0)
+    try:
+        if key in idAllocator.linkedEmbeds:
+            id = idAllocator.next(categoryName)
+        elif categoryName == 'npc':
+            id = writeSingleMonster(data, True)
+        else:
+            id = writeSingleAffliction(data)
+    finally:
+        idAllocator.identity, idAllocator.ordinals = identity, ordinals
+    idAllocator.embeddedRecords[key] = (categoryName, id)
+    return id
+
 def pf2SampleBoxToXML(parentXML, dictionary):
     titleElement = ET.SubElement(parentXML, 'h')
     titleElement.text = dictionary.get('name')
@@ -296,27 +797,49 @@ def frequencyToString(frequency):
             output += frequency.get('special')
     return output
 
+def collectFormattedText(element, pieces):
+    # The text runs a text serialization would give after ET.indent(space=''), without running either
+    if len(element):
+        if element.text and element.text.strip():
+            pieces.append(element.text)
+        for child in element:
+            collectFormattedText(child, pieces)
+            if child.tail and child.tail.strip():
+                pieces.append(child.tail)
+    elif element.text:
+        pieces.append(element.text)
+    return pieces
+
+def formattedPiecesToString(pieces):
+    output = newline.join([piece for piece in pieces if piece != '\n'])
+    return output.replace('<b>', newline).replace('</b>', '')
+
 def xmlToFormattedString(xmlParent):
-    output = ''
-    ET.indent(xmlParent, level=0, space='')
-    arrayHolder = ET.tostringlist(xmlParent, 'unicode', 'text')
-    newLine = ''
-    for ability in arrayHolder:
-        if ability == '\n':
-            continue
-        output += newLine + ability
-        newLine = newline
-    output = output.replace('<b>', newline)
-    output = output.replace('</b>', '')
-    return output
+    return formattedPiecesToString(collectFormattedText(xmlParent, []))
 
 def entriesToString(entries):
-    output = ''
     if entries is None:
-        return output
+        return ''
+    # Plain paragraphs are joined directly, anything else is rendered once per distinct structure
+    if type(entries) is list and all(type(entry) is str for entry in entries):
+        return formattedPiecesToString([text for text in map(stringFormatter, entries) if text])
+    cacheKey = json.dumps(entries, separators=(',', ':'), ensure_ascii=False)
+    # Read from the entries themselves, a cached rendering links to the same records
+    noteReferences(cacheKey)
+    # Embedded creatures and afflictions write their own records, so they always have to be rendered
+    cacheable = '"type":"data"' not in cacheKey
+    if cacheable:
+        output = entriesTextCache.get(cacheKey)
+        if output is not None:
+            entriesTextCache.move_to_end(cacheKey)
+            return output
     holding = ET.Element('body')
     entriesToXML(holding, entries)
     output = xmlToFormattedString(holding)
+    if cacheable:
+        entriesTextCache[cacheKey] = output
+        if len(entriesTextCache) > entriesTextCacheSize:
+            entriesTextCache.popitem(last=False)
     return output
 
 def abilityToNameAndDescription(parentXML, dictionary, oneLine = False, oneLineName = '', monsterName = ''):
@@ -360,11 +883,10 @@ def abilityToNameAndDescription(parentXML, dictionary, oneLine = False, oneLineN
     else:
         createStringTypeElement(parentXML, 'name', nameString)
         createStringTypeElement(parentXML, 'desc', descriptionString)
-        if monsterName:
-            global automationEffects
-            if automationEffects.get(monsterName):
-                if automationEffects.get(monsterName).get(dictionary.get('name')):
-                    createStringTypeElement(parentXML, 'automation', automationEffects.get(monsterName).get(dictionary.get('name')), False)
+        if monsterName and automationEffects and dictionary.get('name') is not None:
+            automation = automationEffects.get(automationKey(monsterName, dictionary.get('name')))
+            if automation:
+                createStringTypeElement(parentXML, 'automation', automation, False)
 
 def spellSavingThrowToString(savingThrow):
     output = ''
@@ -517,61 +1039,374 @@ def getBody(name = ''):
         writeLibraryEntries(name)
     return body
 
+def unescapeMarkup(text):
+    # Formatting tags and [a]-marked action glyphs are written as raw markup, [newline] as a line break
+    if '[a]&amp;' in text:
+        text = text.replace('[a]&amp;', '&')
+        text = text.replace('&lt;', '<').replace('&gt;', '>')
+    if '[newline]' in text:
+        text = text.replace('[newline]', '\n')
+    return text
+
+def formatXMLText(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    return unescapeMarkup(text)
+
+def formatXMLAttribute(value):
+    if '&' in value:
+        value = value.replace('&', '&amp;')
+    if '"' in value:
+        value = value.replace('"', '&quot;')
+    if '\r' in value or '\n' in value or '\t' in value:
+        value = value.replace('\r', '&#13;').replace('\n', '&#10;').replace('\t', '&#09;')
+    return unescapeMarkup(value)
+
+def appendSerializedElement(element, indentation, pieces):
+    # Indents like ET.indent but leaves the tree untouched, shared spellset elements included
+    pieces.append('<' + element.tag)
+    for key, value in element.attrib.items():
+        pieces.append(' ' + key + '="' + formatXMLAttribute(value) + '"')
+    text = element.text
+    if len(element):
+        childIndentation = indentation + recordIndentation
+        pieces.append('>' + formatXMLText(text) if text and text.strip() else '>' + childIndentation)
+        for child in element:
+            appendSerializedElement(child, childIndentation, pieces)
+            tail = child.tail
+            pieces.append(formatXMLText(tail) if tail and tail.strip() else childIndentation)
+        if not (tail and tail.strip()):
+            pieces[-1] = indentation
+        pieces.append('</' + element.tag + '>')
+    elif text:
+        pieces.append('>' + formatXMLText(text) + '</' + element.tag + '>')
+    else:
+        pieces.append(' />')
+
+def serializeElement(element, level=0, xmlDeclaration=False):
+    pieces = ["<?xml version='1.0' encoding='utf-8'?>\n"] if xmlDeclaration else []
+    appendSerializedElement(element, '\n' + recordIndentation * level, pieces)
+    if element.tail:
+        pieces.append(formatXMLText(element.tail))
+    return ''.join(pieces).encode('utf-8')
+
+def serializeRecord(record):
+    return serializeElement(record, 3)
+
+class RecordSpool:
+    # Holds the finished records of each category until db.xml is assembled. Records of one category arrive between
+    # those of others, embedded creatures and afflictions from every category, so none can go into db.xml before
+    # the build is over. Small categories stay in memory, larger ones go to disk and are read back once.
+    def __init__(self):
+        self.files = {}
+        # Categories with links to records that were not merged yet when they were spooled
+        self.unresolvedLinks = set()
+
+    def add(self, categoryName, serializedRecord, unresolvedLinks=False):
+        file = self.files.get(categoryName)
+        if file is None:
+            file = tempfile.SpooledTemporaryFile(recordSpoolMemory)
+            self.files[categoryName] = file
+        file.write(b'\n' + (recordIndentation * 3).encode() + serializedRecord)
+        if unresolvedLinks:
+            self.unresolvedLinks.add(categoryName)
+
+    def hasRecords(self, categoryName):
+        return categoryName in self.files
+
+    def writeInto(self, categoryName, output):
+        file = self.files[categoryName]
+        file.seek(0)
+        if categoryName in self.unresolvedLinks:
+            # Every record is merged by now, the link placeholders left are replaced or dropped. A placeholder is one line,
+            # the blocks are cut before a line break so none is split.
+            pending = b''
+            for block in iter(lambda: file.read(1 << 20), b''):
+                block = pending + block
+                cut = block.rfind(b'\n')
+                pending = block[cut:]
+                output.write(linkListPattern.sub(self.finalLinkList, block[:cut]))
+            output.write(linkListPattern.sub(self.finalLinkList, pending))
+        else:
+            shutil.copyfileobj(file, output)
+        output.write(b'\n' + (recordIndentation * 2).encode())
+
+    def finalLinkList(self, match):
+        return referenceIndex.linkList(match)[0]
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+        self.unresolvedLinks = set()
+
+def flushRecords():
+    for body in rootXML:
+        category = body.find('category')
+        if category is None or len(category) == 0:
+            continue
+        with PhaseTimer('serialize records', len(category)):
+            for record in category:
+                recordSpool.add(body.tag, serializeRecord(record))
+        del category[:]
+
+class RecordCollector:
+    # Stands in for the RecordSpool while a chunk of records is converted on its own
+    def __init__(self):
+        self.records = []
+
+    def add(self, categoryName, serializedRecord):
+        self.records.append((categoryName, serializedRecord))
+
+def recordIDFormat(stable):
+    # Every record of a module is padded to the same width, six digits when the IDs are stable
+    return b'id-%06d' if stable else b'id-%05d'
+
+def stableRecordID(categoryName, identity, ordinal):
+    digest = hashlib.sha1(json.dumps([categoryName, identity, ordinal]).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % stableIDSpace + 1
+
+class IDAllocator:
+    # Hands out record IDs per category. Converted records number from 1 and the merge reserves their final range,
+    # with stable IDs a record's IDs come from its (name, source, add_hash) and do not depend on the build order
+    def __init__(self, stable=False):
+        self.stable = stable
+        self.counters = {categoryName : 1 for categoryName in idCategories}
+        self.allocated = {categoryName : 0 for categoryName in idCategories}
+        self.identity = None
+        self.claimed = {categoryName : set() for categoryName in idCategories}
+        # Stable IDs number the records of each identity on their own, an embedded record's from its embeddedRecordKey
+        self.ordinals = dict.fromkeys(idCategories, 0)
+        # embeddedRecordKey -> (category name, ID) of every embedded record written so far
+        self.embeddedRecords = {}
+        # embeddedRecordKeys an earlier record of the build writes, the current record only links to them
+        self.linkedEmbeds = frozenset()
+        # tagLinkEntries of the current record's tags
+        self.references = set()
+
+    def beginRecord(self, identity):
+        self.identity = identity
+        self.allocated = {categoryName : 0 for categoryName in idCategories}
+        self.ordinals = dict.fromkeys(idCategories, 0)
+        self.embeddedRecords = {}
+        self.references = set()
+
+    def next(self, categoryName):
+        self.allocated[categoryName] += 1
+        if self.stable and self.identity is not None:
+            ordinal = self.ordinals[categoryName]
+            self.ordinals[categoryName] += 1
+            return stableRecordID(categoryName, self.identity, ordinal)
+        number = self.counters[categoryName]
+        self.counters[categoryName] += 1
+        return number
+
+    def reserve(self, categoryName, count):
+        start = self.counters[categoryName]
+        self.counters[categoryName] += count
+        return start
+
+    def claim(self, categoryName, number):
+        # Two records hashing to the same stable ID: the one merged later moves to the next free number
+        claimed = self.claimed[categoryName]
+        while number in claimed:
+            number = number % stableIDSpace + 1
+        claimed.add(number)
+        return number
+
+idAllocator = IDAllocator()
+
+def requiredField(record, key, kind):
+    # A record missing a field its writer cannot do without is reported by name instead of failing halfway through
+    value = record.get(key)
+    if value is None:
+        raise ValueError(kind + ' ' + str(record.get('name')) + ' (' + str(record.get('source')) + ') has no ' + key)
+    return value
+
+# Slotted views of the pf2etools records, every field a writer reads is looked up once when the record is loaded
+
+class Feat:
+    __slots__ = ('name', 'source', 'level', 'activity', 'archetype', 'entries', 'frequency', 'prerequisites', 'requirements', 'special',
+                 'traits', 'trigger')
+
+    def __init__(self, feat):
+        self.name = feat.get('name')
+        self.source = feat.get('source')
+        self.level = feat.get('level')
+        self.activity = feat.get('activity')
+        # featType.archetype is true for archetype feats in general, or the list of archetypes the feat belongs to
+        archetype = (feat.get('featType') or {}).get('archetype')
+        self.archetype = archetype if archetype and type(archetype) is not bool else None
+        self.entries = feat.get('entries')
+        self.frequency = feat.get('frequency')
+        self.prerequisites = feat.get('prerequisites')
+        self.requirements = feat.get('requirements')
+        self.special = feat.get('special')
+        self.traits = feat.get('traits')
+        self.trigger = feat.get('trigger')
+
+class Spell:
+    __slots__ = ('name', 'source', 'level', 'focus', 'traits', 'traditions', 'area', 'cost', 'duration', 'primaryCheck', 'secondaryCheck',
+                 'secondaryCasters', 'entries', 'successDegrees', 'heightened', 'requirements', 'savingThrow', 'range', 'trigger',
+                 'components', 'cast', 'targets')
+
+    def __init__(self, spell):
+        self.name = spell.get('name')
+        self.source = spell.get('source')
+        self.level = spell.get('level')
+        self.focus = spell.get('focus')
+        self.traits = spell.get('traits') or []
+        self.traditions = spell.get('traditions')
+        self.area = spell.get('area')
+        self.cost = spell.get('cost')
+        self.duration = spell.get('duration')
+        self.primaryCheck = spell.get('primaryCheck')
+        self.secondaryCheck = spell.get('secondaryCheck')
+        self.secondaryCasters = spell.get('secondaryCasters')
+        self.entries = spell.get('entries') or []
+        # Degree of success -> text of the last successDegree entry
+        self.successDegrees = {}
+        for entry in self.entries:
+            if type(entry) is dict and entry.get('type') == 'successDegree':
+                self.successDegrees = entry.get('entries')
+        self.heightened = spell.get('heightened')
+        self.requirements = spell.get('requirements')
+        self.savingThrow = spell.get('savingThrow')
+        self.range = spell.get('range')
+        self.trigger = spell.get('trigger')
+        self.components = spell.get('components') or []
+        self.cast = requiredField(spell, 'cast', 'Spell')
+        self.targets = spell.get('targets')
+
+def creatureTraits(beast):
+    # Rarity, alignment and size are listed first, the way the statblock shows them
+    traits = [beast.get(key) for key in ('rarity', 'alignment', 'size') if beast.get(key) is not None]
+    traits.extend(beast.get('creatureType') or [])
+    traits.extend(beast.get('traits') or [])
+    return traits
+
+class Creature:
+    __slots__ = ('name', 'source', 'level', 'ac', 'savingThrows', 'hardness', 'hp', 'immunities', 'resistances', 'weaknesses', 'abilityMods',
+                 'perception', 'senses', 'languages', 'items', 'skills', 'speed', 'traits', 'attacks', 'abilitiesTop', 'abilitiesMid',
+                 'abilitiesBot', 'spellcasting', 'rituals')
+
+    def __init__(self, beast):
+        self.name = beast.get('name')
+        self.source = requiredField(beast, 'source', 'Creature')
+        self.level = beast.get('level')
+        defenses = requiredField(beast, 'defenses', 'Creature')
+        self.ac = defenses.get('ac')
+        self.savingThrows = defenses.get('savingThrows')
+        self.hardness = defenses.get('hardness')
+        self.hp = defenses.get('hp')
+        self.immunities = defenses.get('immunities')
+        self.resistances = defenses.get('resistances')
+        self.weaknesses = defenses.get('weaknesses')
+        self.abilityMods = beast.get('abilityMods')
+        self.perception = beast.get('perception')
+        self.senses = beast.get('senses')
+        languages = beast.get('languages') or {}
+        self.languages = [*(languages.get('languages') or []), *(languages.get('abilities') or [])]
+        self.items = beast.get('items')
+        self.skills = beast.get('skills') or {}
+        self.speed = beast.get('speed')
+        self.traits = creatureTraits(beast)
+        self.attacks = beast.get('attacks')
+        self.abilitiesTop = beast.get('abilitiesTop') or []
+        self.abilitiesMid = beast.get('abilitiesMid') or []
+        self.abilitiesBot = beast.get('abilitiesBot') or []
+        self.spellcasting = beast.get('spellcasting') or []
+        self.rituals = beast.get('rituals') or []
+
+class Hazard:
+    __slots__ = ('name', 'level', 'traits', 'description', 'defenses', 'disable', 'reset', 'routine', 'stealth', 'actions')
+
+    def __init__(self, hazard):
+        self.name = hazard.get('name')
+        self.level = hazard.get('level')
+        self.traits = hazard.get('traits')
+        self.description = hazard.get('description')
+        self.defenses = hazard.get('defenses')
+        self.disable = requiredField(hazard, 'disable', 'Hazard').get('entries')
+        self.reset = hazard.get('reset')
+        self.routine = hazard.get('routine')
+        self.stealth = hazard.get('stealth')
+        self.actions = hazard.get('actions') or []
+
+class Item:
+    __slots__ = ('name', 'source', 'level', 'category', 'subCategory', 'traits', 'usage', 'bulk', 'activate', 'perception', 'senses',
+                 'communication', 'skills', 'abilityMods', 'savingThrows', 'contract', 'entries', 'price', 'craftReq', 'shieldData', 'onset',
+                 'hands', 'access', 'ammunition', 'comboWeaponData', 'weaponData', 'armorData')
+
+    def __init__(self, item):
+        # Items that only differ by add_hash keep it in their name, an item without one gets an empty name
+        self.name = item.get('name')
+        if self.name is not None and item.get('add_hash'):
+            self.name += ' (' + str(item.get('add_hash')) + ')'
+        self.source = item.get('source')
+        self.level = item.get('level')
+        self.category = item.get('category')
+        self.subCategory = item.get('subCategory')
+        self.traits = item.get('traits')
+        self.usage = item.get('usage')
+        self.bulk = item.get('bulk')
+        self.activate = item.get('activate')
+        self.perception = item.get('perception')
+        self.senses = item.get('senses')
+        self.communication = item.get('communication')
+        self.skills = item.get('skills')
+        self.abilityMods = item.get('abilityMods')
+        self.savingThrows = item.get('savingThrows')
+        self.contract = item.get('contract')
+        self.entries = item.get('entries')
+        self.price = item.get('price')
+        self.craftReq = item.get('craftReq')
+        self.shieldData = item.get('shieldData')
+        self.onset = item.get('onset')
+        self.hands = item.get('hands')
+        self.access = item.get('access')
+        self.ammunition = item.get('ammunition')
+        self.comboWeaponData = item.get('comboWeaponData')
+        self.weaponData = item.get('weaponData')
+        self.armorData = item.get('armorData')
+
 def writeSingleFeat(feat):
-    global featID
+    feat = Feat(feat)
+    featNumber = idAllocator.next('feat')
     featXML = getBody('feat')
     category = getCategory(featXML)
-    featBody = ET.SubElement(category, f'id-{featID:05}')
+    featBody = ET.SubElement(category, f'id-{featNumber:05}')
     createStringTypeElement(featBody, 'access', 'PF2e Tools') 
-    createStringTypeElement(featBody, 'action', activityToString(feat.get('activity'), False))
-
-    archeTypeText = ''
-    if feat.get('featType'):
-        featType = feat.get('featType')
-        if featType.get('archetype'):
-            featArchetypeRestriction = featType.get('archetype')
-            if type(featArchetypeRestriction) != bool:
-                archeTypeText = listToString(featArchetypeRestriction)
-
-    createStringTypeElement(featBody, 'archetype', archeTypeText)
+    createStringTypeElement(featBody, 'action', activityToString(feat.activity, False))
+    createStringTypeElement(featBody, 'archetype', listToString(feat.archetype))
 
     effectsBenefits = ET.SubElement(
         featBody, 'effectsbenefits', typeFormattedText)
-    if 'entries' in feat:
-        entriesToXML(effectsBenefits, feat.get('entries'))
+    entriesToXML(effectsBenefits, feat.entries)
 
-    createStringTypeElement(featBody, 'frequency', frequencyToString(feat.get('frequency')))
-    createNumberTypeElement(featBody, 'level', feat.get('level'))
+    createStringTypeElement(featBody, 'frequency', frequencyToString(feat.frequency))
+    createNumberTypeElement(featBody, 'level', feat.level)
     # This is constant and also I have no idea if it is used
     createNumberTypeElement(featBody, 'level_applied', 0)
-    createStringTypeElement(featBody, 'name', feat.get('name'))
-    createStringTypeElement(featBody, 'prerequisites', feat.get('prerequisites'))
-    createStringTypeElement(featBody, 'requirements', feat.get('requirements'))
+    createStringTypeElement(featBody, 'name', feat.name)
+    createStringTypeElement(featBody, 'prerequisites', feat.prerequisites)
+    createStringTypeElement(featBody, 'requirements', feat.requirements)
     createStringTypeElement(featBody, 'shortbenefits', '')
-    createStringTypeElement(featBody, 'source', feat.get('source'))
+    createStringTypeElement(featBody, 'source', feat.source)
     special = ET.SubElement(featBody, 'special', typeFormattedText)
     specialText = ET.SubElement(special, 'p')
-    specialText.text = ''
-    if 'special' in feat:
-        specialText.text = listToString(feat.get('special'), '\n')
-
-    createStringTypeElement(featBody, 'traits', listToString(feat.get('traits')).upper())
-    createStringTypeElement(featBody, 'trigger', feat.get('trigger'))
-    featID += 1
-    return featID - 1
+    specialText.text = listToString(feat.special, '\n')
+
+    createStringTypeElement(featBody, 'traits', listToString(feat.traits).upper())
+    createStringTypeElement(featBody, 'trigger', feat.trigger)
+    return featNumber
     
-def writeFeats():
-    file = open('feats-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for feat in data:
-        writeSingleFeat(feat)
-        
+
 def writeSingleBackground(background):
-    global backgroundID
+    backgroundNumber = idAllocator.next('background')
     backgroundXML = getBody('background')
     category = getCategory(backgroundXML)
-    backgroundBody = ET.SubElement(category, f'id-{backgroundID:05}')
+    backgroundBody = ET.SubElement(category, f'id-{backgroundNumber:05}')
 
     boostsBody = ET.SubElement(backgroundBody, 'abilityboost', typeString)
     if 'boosts' in background:
@@ -602,131 +1437,102 @@ def writeSingleBackground(background):
         entriesToXML(entriesGroup, background.get('entries'))
     createStringTypeElement(backgroundBody, 'trainedskill', optionListToString(background.get('skills')))
 
-    backgroundID += 1
-    return backgroundID - 1
-
-def writeBackgrounds():
-    file = open('backgrounds-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for background in data:
-        writeSingleBackground(background)
+    return backgroundNumber
 
 def writeSingleSpell(spell, spellNameAppend = '', isRitual = False, id=None, newBody=None):
-    global spellID
-    currentID = spellID
-    if id:
-        currentID = id
-    if newBody:
+    spell = Spell(spell)
+    # Spells inside a spellset are numbered by the spellset and take no ID of the spell list
+    currentID = id if id else idAllocator.next('spell')
+    if newBody is not None:
         spellBody = ET.SubElement(newBody, f'id-{currentID:05}')
     else:
         spellBody = ET.SubElement(getCategory(getBody('spell')), f'id-{currentID:05}')
-    createStringTypeElement(spellBody, 'name', spell.get('name') + spellNameAppend)
-    createStringTypeElement(spellBody, 'source', spell.get('source'))
+    createStringTypeElement(spellBody, 'name', spell.name + spellNameAppend)
+    createStringTypeElement(spellBody, 'source', spell.source)
     spellTypeString = 'SPELL'
-    if spell.get('focus'):
+    if spell.focus:
         spellTypeString = 'FOCUS'
     if isRitual:
         spellTypeString = 'RITUAL'
     createStringTypeElement(spellBody, 'spelltype', spellTypeString)
     createStringTypeElement(spellBody, 'spelltypelabel', spellTypeString[0])
-    createListToXMLString(spellBody, spell.get('traits'), 'traits')
+    createListToXMLString(spellBody, spell.traits, 'traits')
     areaElement = ET.SubElement(spellBody, 'area', typeString)
-    if 'area' in spell:
-        areaElement.text = stringFormatter(spell.get('area').get('entry'))
-    createStringTypeElement(spellBody, 'cost', spell.get('cost'))
-    if spell.get('duration'):
-        createStringTypeElement(spellBody, 'duration', spell.get('duration').get('entry'))
+    if spell.area is not None:
+        areaElement.text = stringFormatter(spell.area.get('entry'))
+    createStringTypeElement(spellBody, 'cost', spell.cost)
+    if spell.duration:
+        createStringTypeElement(spellBody, 'duration', spell.duration.get('entry'))
     effectsElement = ET.SubElement(spellBody, 'effects', typeFormattedText)
-    if spell.get('primaryCheck'):
-        boldTextAndBody(effectsElement, 'Primary Check ', spell.get('primaryCheck').get('entry'))
-    if spell.get('secondaryCheck'):
-        boldTextAndBody(effectsElement, 'Secondary Check ', spell.get('secondaryCheck').get('entry'))
-    if spell.get('secondaryCasters'):
-        secondaryCastersString = str(spell.get('secondaryCasters').get('number'))
-        if spell.get('secondaryCasters').get('note'):
-            secondaryCastersString += ' ' + spell.get('secondaryCasters').get('note')
+    if spell.primaryCheck:
+        boldTextAndBody(effectsElement, 'Primary Check ', spell.primaryCheck.get('entry'))
+    if spell.secondaryCheck:
+        boldTextAndBody(effectsElement, 'Secondary Check ', spell.secondaryCheck.get('entry'))
+    if spell.secondaryCasters:
+        secondaryCastersString = str(spell.secondaryCasters.get('number'))
+        if spell.secondaryCasters.get('note'):
+            secondaryCastersString += ' ' + spell.secondaryCasters.get('note')
         boldTextAndBody(effectsElement, 'Secondary Casters ', secondaryCastersString)
-    entriesToXML(effectsElement, spell.get('entries'), ['successDegree'])
-    if spell.get('heightened'):
-        if spell.get('heightened').get('plus_x') is not None:
-            properNumber = '(+' + str(spell.get('heightened').get('plus_x').get('level')) + ')'
-            heightenedEntry = stringFormatter(spell.get('heightened').get('plus_x').get('entry'))
+    entriesToXML(effectsElement, spell.entries, ['successDegree'])
+    if spell.heightened:
+        plusX = spell.heightened.get('plus_x')
+        if plusX is not None:
+            properNumber = '(+' + str(plusX.get('level')) + ')'
+            heightenedEntry = stringFormatter(plusX.get('entry'))
             heightenedElement = ET.SubElement(spellBody, 'heightened', typeFormattedText)
             boldTextAndBody(heightenedElement, properNumber, heightenedEntry)
-        if spell.get('heightened').get('x') is not None:
-            spellHeightenedListToXML(spellBody,  spell.get('heightened').get('x'))
-    createNumberTypeElement(spellBody, 'level', spell.get('level'))
-    createStringTypeElement(spellBody, 'requirements', spell.get('requirements'))
-    createStringTypeElement(spellBody, 'savingthrow', spellSavingThrowToString(spell.get('savingThrow')))
-    createListToXMLString(spellBody, spell.get('traditions'), 'traditions', False)
+        if spell.heightened.get('x') is not None:
+            spellHeightenedListToXML(spellBody, spell.heightened.get('x'))
+    createNumberTypeElement(spellBody, 'level', spell.level)
+    createStringTypeElement(spellBody, 'requirements', spell.requirements)
+    createStringTypeElement(spellBody, 'savingthrow', spellSavingThrowToString(spell.savingThrow))
+    createListToXMLString(spellBody, spell.traditions, 'traditions', False)
     rangeElement = ET.SubElement(spellBody, 'range', typeString)
-    if 'range' in spell:
-        rangeElement.text = stringFormatter(spell.get('range').get('entry'))
-    createStringTypeElement(spellBody, 'trigger', spell.get('trigger'))
+    if spell.range is not None:
+        rangeElement.text = stringFormatter(spell.range.get('entry'))
+    createStringTypeElement(spellBody, 'trigger', spell.trigger)
     components = []
-    if spell.get('components'):
-        if 'M' in spell.get('components'):
-            components.append('material')
-        if 'S' in spell.get('components'):
-            components.append('somatic')
-        if 'V' in spell.get('components'):
-            components.append('verbal')
+    if 'M' in spell.components:
+        components.append('material')
+    if 'S' in spell.components:
+        components.append('somatic')
+    if 'V' in spell.components:
+        components.append('verbal')
     castingElement = ET.SubElement(spellBody, 'casting', typeString)
-    if 'entry' in spell.get('cast'):
-        castingElement.text = stringFormatter(spell.get('cast').get('entry'))
+    if 'entry' in spell.cast:
+        castingElement.text = stringFormatter(spell.cast.get('entry'))
     else:
-        castingElement.text = activityToString(spell.get('cast'))
+        castingElement.text = activityToString(spell.cast)
     castingElement.text += ' ' + listToString(components)
-    createStringTypeElement(spellBody, 'targets', spell.get('targets'))
+    createStringTypeElement(spellBody, 'targets', spell.targets)
     spellListElement = ET.SubElement(spellBody, 'spelllists', typeString)
     superScriptsList = []
-    if spell.get('heightened'):
+    if spell.heightened:
         superScriptsList.append('H')
-    if 'Uncommon' in spell.get('traits'):
+    if 'Uncommon' in spell.traits:
         superScriptsList.append('U')
-    if 'Rare' in spell.get('traits'):
+    if 'Rare' in spell.traits:
         superScriptsList.append('R')
     createStringTypeElement(spellBody, 'superscripts', listToString(superScriptsList))
-    entryDictionaryHolder = {}
-    for entry in spell.get('entries'):
-        if type(entry) is dict:
-            if entry.get('type') == 'successDegree':
-                entryDictionaryHolder = entry.get('entries')
-    createStringTypeElement(spellBody, 'critfailure', entryDictionaryHolder.get('Critical Failure'))
-    createStringTypeElement(spellBody, 'failure', entryDictionaryHolder.get('Failure'))
-    createStringTypeElement(spellBody, 'success', entryDictionaryHolder.get('Success'))
-    createStringTypeElement(spellBody, 'critsuccess', entryDictionaryHolder.get('Critical Success'))
+    createStringTypeElement(spellBody, 'critfailure', spell.successDegrees.get('Critical Failure'))
+    createStringTypeElement(spellBody, 'failure', spell.successDegrees.get('Failure'))
+    createStringTypeElement(spellBody, 'success', spell.successDegrees.get('Success'))
+    createStringTypeElement(spellBody, 'critsuccess', spell.successDegrees.get('Critical Success'))
     ET.SubElement(spellBody, 'actions')
-    spellID += 1
     return spellBody
 
-def writeSpells():
-    file = open('spells-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for spell in data:
-        writeSingleSpell(spell)
-
-def writeRituals():
-    file = open('rituals-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for spell in data:
-        writeSingleSpell(spell, isRitual=True)
-
-def perceptionBodyToString(body):
-    if body.get('perception') is None:
+def perceptionToString(perception, senses):
+    if perception is None:
         return ''
-    output = 'Perception +' + str(body.get('perception').get('std')) + '; '
-    for perception in body.get('perception'):
-        if perception == 'std':
+    output = 'Perception +' + str(perception.get('std')) + '; '
+    for perceptionKey in perception:
+        if perceptionKey == 'std':
             continue
-        output += '(+' + str(body.get('perception').get(perception)) + ' ' + perception + '); '
-    if body.get('senses') is not None:
-        for sense in body.get('senses'):
+        output += '(+' + str(perception.get(perceptionKey)) + ' ' + perceptionKey + '); '
+    if senses is not None:
+        for sense in senses:
             if sense.get('name') == 'other':
-                output += listToString(body.get('senses').get(sense)) + ', '
+                output += listToString(senses.get(sense)) + ', '
             else:
                 if sense.get('type') is not None:
                     output += stringFormatter(sense.get('type')) + ' '
@@ -937,13 +1743,57 @@ def immunitiesToString(immunityDict):
         immunitiesString = listToString(immunityDict)
     return immunitiesString
 
+def writeSpellsetSpell(spell, spellNameAppend, id, newBody):
+    # A spell is rendered once, later spellsets share its elements and only get their own name
+    fragments = getSpellCatalogue().spellsetFragments
+    identity = recordIdentity(spell)
+    if fragments.get(identity) is not None:
+        spellBody = ET.SubElement(newBody, f'id-{id:05}')
+        createStringTypeElement(spellBody, 'name', spell.get('name') + spellNameAppend)
+        spellBody.extend(fragments[identity])
+        return spellBody
+    allocated = dict(idAllocator.allocated)
+    # What the spell's text names is linked from the spell's own record, not from every caster of it
+    references = idAllocator.references
+    idAllocator.references = set()
+    try:
+        spellBody = writeSingleSpell(spell, spellNameAppend=spellNameAppend, id=id, newBody=newBody)
+    finally:
+        idAllocator.references = references
+    # Spells that embed records of their own are rendered again every time
+    fragments[identity] = list(spellBody)[1:] if idAllocator.allocated == allocated else None
+    return spellBody
+
+# The parts of a spellset that are the same for every caster are built once and shared by every spellset,
+# the serializer only reads the tree. A level without spells is shared whole.
+@functools.lru_cache(None)
+def spellLevelCounters(level):
+    holder = ET.Element('level')
+    createNumberTypeElement(holder, 'level', level)
+    createNumberTypeElement(holder, 'maxprepared', 0)
+    createNumberTypeElement(holder, 'totalcast', 0)
+    createNumberTypeElement(holder, 'totalprepared', 0)
+    return list(holder)
+
+@functools.lru_cache(None)
+def emptySpellLevel(level):
+    levelElementBody = ET.Element(f'level{level}')
+    levelElementBody.extend(spellLevelCounters(level))
+    ET.SubElement(levelElementBody, 'spells')
+    availableElement = ET.Element(f'availablelevel{level}', typeNumber)
+    availableElement.text = '0'
+    return levelElementBody, availableElement
+
+@functools.lru_cache(None)
+def spellDCCounters():
+    # Everything of the dc block except misc and total, before and after them
+    holder = ET.Element('dc')
+    for name in ('abilitymod', 'item', 'prof', 'roll', 'rolltempmod', 'tempmod'):
+        createNumberTypeElement(holder, name, 0)
+    return list(holder)[:2], list(holder)[2:]
+
 def parseMonsterSpells(monsterSpellListXML, spellLists, characterLevel):
-    spellListData = {}
-    file = open('spells-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for spell in data:
-        spellListData[spell.get('name').lower()] = spell
+    catalogue = getSpellCatalogue()
     spellListID = 1
     for spellList in spellLists:
         spellEntries = spellList.get('entry')
@@ -968,63 +1818,61 @@ def parseMonsterSpells(monsterSpellListXML, spellLists, characterLevel):
             spellAttackBonusNumber = spellList.get('attack')
         createNumberTypeElement(spellIdElement, 'spellatkbonus', spellAttackBonusNumber)
         DCElementBody = ET.SubElement(spellIdElement, 'dc')
-        createNumberTypeElement(DCElementBody, 'abilitymod', 0)
-        createNumberTypeElement(DCElementBody, 'item', 0)
+        countersBefore, countersAfter = spellDCCounters()
+        DCElementBody.extend(countersBefore)
         createNumberTypeElement(DCElementBody, 'misc', DCTotalNumber - 10)
-        createNumberTypeElement(DCElementBody, 'prof', 0)
-        createNumberTypeElement(DCElementBody, 'roll', 0)
-        createNumberTypeElement(DCElementBody, 'rolltempmod', 0)
-        createNumberTypeElement(DCElementBody, 'tempmod', 0)
+        DCElementBody.extend(countersAfter)
         createNumberTypeElement(DCElementBody, 'total', DCTotalNumber)
         levelsElementBody = ET.SubElement(spellIdElement, 'levels')
         for level in range(0, 11):
             countAllSpells = False
-            levelElementBody = ET.SubElement(levelsElementBody, f'level{level}')
-            createNumberTypeElement(levelElementBody, 'level', level)
-            createNumberTypeElement(levelElementBody, 'maxprepared', 0)
-            createNumberTypeElement(levelElementBody, 'totalcast', 0)
-            createNumberTypeElement(levelElementBody, 'totalprepared', 0)
-            spellListEntriesBody = ET.SubElement(levelElementBody, 'spells')
             availableSpells = 0
             spellEntry = spellEntries.get(str(level))
-            if spellEntry:
-                if level == 0 and spellEntry.get('level'):
-                    availableSpells = spellEntry.get('level')
-                elif spellEntry.get('slots'):
-                    availableSpells = spellEntry.get('slots')
-                elif spellList.get('type') != 'Prepared':
-                    countAllSpells = True
-                    availableSpells = 1
-                spellFromDataList = spellEntry.get('spells')
-                for i in  range(0, len(spellFromDataList)):
-                    notes = ''
-                    if spellListData.get(spellFromDataList[i].get('name').lower()) is None:
-                        continue
-                    spellBase = spellListData.get(spellFromDataList[i].get('name').lower())
-                    if spellFromDataList[i].get('notes'):
-                        notes = ' ' + listToString(spellFromDataList[i].get('notes'))
-                    if spellFromDataList[i].get('amount'):
-                        notes += ' (' + str(spellFromDataList[i].get('amount')) + ' time(s))'
-                    spellBody = writeSingleSpell(spellBase, spellNameAppend=notes, id=i+1, newBody=spellListEntriesBody)
-                    preparedAmount = 1
-                    if type(spellFromDataList[i].get('amount')) is int:
-                        preparedAmount = spellFromDataList[i].get('amount')
-                    if spellList.get('type') != 'Focus':
-                        createNumberTypeElement(spellBody, 'prepared', preparedAmount)
-                    if countAllSpells:
-                        availableSpells += preparedAmount
-                    createNumberTypeElement(spellBody, 'cast', 0)
-                    createNumberTypeElement(spellBody, 'spcost', 1)
+            if not spellEntry:
+                levelElementBody, availableElement = emptySpellLevel(level)
+                levelsElementBody.append(levelElementBody)
+                spellIdElement.append(availableElement)
+                continue
+            levelElementBody = ET.SubElement(levelsElementBody, f'level{level}')
+            levelElementBody.extend(spellLevelCounters(level))
+            spellListEntriesBody = ET.SubElement(levelElementBody, 'spells')
+            if level == 0 and spellEntry.get('level'):
+                availableSpells = spellEntry.get('level')
+            elif spellEntry.get('slots'):
+                availableSpells = spellEntry.get('slots')
+            elif spellList.get('type') != 'Prepared':
+                countAllSpells = True
+                availableSpells = 1
+            spellFromDataList = spellEntry.get('spells')
+            for i in  range(0, len(spellFromDataList)):
+                notes = ''
+                spellBase = catalogue.find(spellFromDataList[i].get('name'))
+                if spellBase is None:
+                    continue
+                if spellFromDataList[i].get('notes'):
+                    notes = ' ' + listToString(spellFromDataList[i].get('notes'))
+                if spellFromDataList[i].get('amount'):
+                    notes += ' (' + str(spellFromDataList[i].get('amount')) + ' time(s))'
+                spellBody = writeSpellsetSpell(spellBase, notes, i + 1, spellListEntriesBody)
+                preparedAmount = 1
+                if type(spellFromDataList[i].get('amount')) is int:
+                    preparedAmount = spellFromDataList[i].get('amount')
+                if spellList.get('type') != 'Focus':
+                    createNumberTypeElement(spellBody, 'prepared', preparedAmount)
+                if countAllSpells:
+                    availableSpells += preparedAmount
+                createNumberTypeElement(spellBody, 'cast', 0)
+                createNumberTypeElement(spellBody, 'spcost', 1)
             createNumberTypeElement(spellIdElement, f'availablelevel{level}', availableSpells)
         spellListID += 1  
 
 def writeSingleMonster(beast, createMonsterSpellList = False):
-    global npcID
-    beastBody = ET.SubElement(getCategory(getBody('npc')), f'id-{npcID:05}')
-    defenses = beast.get('defenses')
-    createStringTypeElement(beastBody, 'ac', acDictToString(defenses.get('ac')))
-    createStringTypeElement(beastBody, 'category', moduleName + ' ' + beast.get('source'))
-    abilityModsEntry = beast.get('abilityMods')
+    beast = Creature(beast)
+    beastNumber = idAllocator.next('npc')
+    beastBody = ET.SubElement(getCategory(getBody('npc')), f'id-{beastNumber:05}')
+    createStringTypeElement(beastBody, 'ac', acDictToString(beast.ac))
+    createStringTypeElement(beastBody, 'category', moduleName + ' ' + beast.source)
+    abilityModsEntry = beast.abilityMods
     if abilityModsEntry is not None:
         createNumberTypeElement(beastBody, 'strength', abilityModsEntry.get('str'))
         createNumberTypeElement(beastBody, 'dexterity', abilityModsEntry.get('dex'))
@@ -1032,20 +1880,20 @@ def writeSingleMonster(beast, createMonsterSpellList = False):
         createNumberTypeElement(beastBody, 'intelligence', abilityModsEntry.get('int'))
         createNumberTypeElement(beastBody, 'wisdom', abilityModsEntry.get('wis'))
         createNumberTypeElement(beastBody, 'charisma', abilityModsEntry.get('cha'))
-    saves = defenses.get('savingThrows')
+    saves = beast.savingThrows
     if saves is not None:
         createNumberTypeElement(beastBody, 'fortitudesave', saves.get('fort').get('std'))
         createNumberTypeElement(beastBody, 'reflexsave', saves.get('ref').get('std'))
         createNumberTypeElement(beastBody, 'willsave', saves.get('will').get('std'))
         createStringTypeElement(beastBody, 'saveabilities', saves.get('abilities'))
-    if defenses.get('hardness') is not None:
-        createStringTypeElement(beastBody, 'hardness', str(beast.get('hardness')))
+    if beast.hardness is not None:
+        createStringTypeElement(beastBody, 'hardness', str(beast.hardness))
     
-    if defenses.get('hp') is not None:
-        createNumberTypeElement(beastBody, 'hp', defenses.get('hp')[0].get('hp'))
+    if beast.hp is not None:
+        createNumberTypeElement(beastBody, 'hp', beast.hp[0].get('hp'))
     hpAbilities = ''
-    if defenses.get('hp') is not None:
-        for hpEntries in defenses.get('hp'):
+    if beast.hp is not None:
+        for hpEntries in beast.hp:
             if hpEntries.get('note') is not None:
                 hpAbilities += boldString(hpEntries.get('note')) + ' '
             hpAbilities += str(hpEntries.get('hp')) + ' '
@@ -1054,91 +1902,67 @@ def writeSingleMonster(beast, createMonsterSpellList = False):
         if hpAbilities.replace(' ', '').isdigit():
             hpAbilities = ''
     createStringTypeElement(beastBody, 'hpabilities', hpAbilities)        
-    createStringTypeElement(beastBody, 'immunities', immunitiesToString(defenses.get('immunities')))
-    if beast.get('perception') is not None:
-        createNumberTypeElement(beastBody, 'init', beast.get('perception').get('std'))
+    createStringTypeElement(beastBody, 'immunities', immunitiesToString(beast.immunities))
+    if beast.perception is not None:
+        createNumberTypeElement(beastBody, 'init', beast.perception.get('std'))
     else:
         createNumberTypeElement(beastBody, 'init', 0)
-    languageString = ''
-    if beast.get('languages') is not None:
-        combinedLanguages = []
-        if beast.get('languages').get('languages') is not None:
-            combinedLanguages.extend(beast.get('languages').get('languages'))
-        if beast.get('languages').get('abilities') is not None:
-            combinedLanguages.extend(beast.get('languages').get('abilities'))
-        languageString = listToString(combinedLanguages)
-    createStringTypeElement(beastBody, 'languages', languageString)
-    createNumberTypeElement(beastBody, 'level', beast.get('level'))
-    createStringTypeElement(beastBody, 'name', beast.get('name'))
+    createStringTypeElement(beastBody, 'languages', listToString(beast.languages))
+    createNumberTypeElement(beastBody, 'level', beast.level)
+    createStringTypeElement(beastBody, 'name', beast.name)
     createStringTypeElement(beastBody, 'nonid_name', '')
-    createStringTypeElement(beastBody, 'resistances', weaknessAndResistanceToString(defenses.get('resistances')))
-    createStringTypeElement(beastBody, 'weaknesses', weaknessAndResistanceToString(defenses.get('weaknesses')))
-    createStringTypeElement(beastBody, 'senses', perceptionBodyToString(beast))
-    createStringTypeElement(beastBody, 'items', listToString(beast.get('items')))
-    createStringTypeElement(beastBody, 'skills', skillsDictToString(beast.get('skills')))
-    createStringTypeElement(beastBody, 'speed', speedStringFromSpeedDictionary(beast.get('speed')))
+    createStringTypeElement(beastBody, 'resistances', weaknessAndResistanceToString(beast.resistances))
+    createStringTypeElement(beastBody, 'weaknesses', weaknessAndResistanceToString(beast.weaknesses))
+    createStringTypeElement(beastBody, 'senses', perceptionToString(beast.perception, beast.senses))
+    createStringTypeElement(beastBody, 'items', listToString(beast.items))
+    createStringTypeElement(beastBody, 'skills', skillsDictToString(beast.skills))
+    createStringTypeElement(beastBody, 'speed', speedStringFromSpeedDictionary(beast.speed))
     createStringTypeElement(beastBody, 'spelldisplaymode', 'action')
     createStringTypeElement(beastBody, 'spellmode', 'standard')
     createStringTypeElement(beastBody, 'subcategory', '')
     textElement = ET.SubElement(beastBody, 'text', typeFormattedText)
     ET.SubElement(textElement, 'p')
     ET.SubElement(beastBody, 'token', {'type' : 'token'})
-    traits = []
-    if beast.get('rarity') is not None:
-        traits.append(beast.get('rarity'))
-    if beast.get('alignment') is not None:
-        traits.append(beast.get('alignment'))
-    if beast.get('size') is not None:
-        traits.append(beast.get('size'))
-    if beast.get('creatureType') is not None:
-        traits.extend(beast.get('creatureType'))
-    if beast.get('traits') is not None:
-        traits.extend(beast.get('traits'))
-    createStringTypeElement(beastBody, 'traits', listToString(traits))
+    createStringTypeElement(beastBody, 'traits', listToString(beast.traits))
     miscellaneousElement = ET.SubElement(beastBody, 'miscellaneous', typeFormattedText)
     miscellaneousText = ET.SubElement(miscellaneousElement, 'p')
-    createStringTypeElement(beastBody, 'meleeatk', attackStringFromAttacks(beast.get('attacks')))
-    createStringTypeElement(beastBody, 'rangedatk', attackStringFromAttacks(beast.get('attacks'), 'Ranged'))
+    createStringTypeElement(beastBody, 'meleeatk', attackStringFromAttacks(beast.attacks))
+    createStringTypeElement(beastBody, 'rangedatk', attackStringFromAttacks(beast.attacks, 'Ranged'))
     interactionAbilitiesElement = ET.SubElement(beastBody, 'actions_interactionabilities')
-    if beast.get('abilitiesTop') is not None:
-        for i in range(0, len(beast.get('abilitiesTop'))):
-            monsterAbilityToXML(interactionAbilitiesElement, beast.get('abilitiesTop')[i], i + 1, beast.get('name'))
+    for index, ability in enumerate(beast.abilitiesTop, 1):
+        monsterAbilityToXML(interactionAbilitiesElement, ability, index, beast.name)
     offensiveProactiveElement = ET.SubElement(beastBody, 'actions_offensiveproactive')
-    if beast.get('abilitiesBot') is not None:
-        for i in range(0, len(beast.get('abilitiesBot'))):
-            monsterAbilityToXML(offensiveProactiveElement, beast.get('abilitiesBot')[i], i + 1, beast.get('name'))
+    for index, ability in enumerate(beast.abilitiesBot, 1):
+        monsterAbilityToXML(offensiveProactiveElement, ability, index, beast.name)
     reactiveAbilitiesElement = ET.SubElement(beastBody, 'actions_reactiveabilities')
-    if beast.get('abilitiesMid') is not None:
-        for i in range(0, len(beast.get('abilitiesMid'))):
-            monsterAbilityToXML(reactiveAbilitiesElement, beast.get('abilitiesMid')[i], i + 1, beast.get('name'))
+    for index, ability in enumerate(beast.abilitiesMid, 1):
+        monsterAbilityToXML(reactiveAbilitiesElement, ability, index, beast.name)
     innateSpellString = ''
     focusSpellString = ''
     focusPointBase = 0
     genericSpellString = ''
-    if beast.get('spellcasting') is not None:
-        for spellCasting in beast.get('spellcasting'):
-            if spellCasting.get('type') == 'Innate':
-                innateSpellString += spellFromSpellCasting(spellCasting)
-            elif spellCasting.get('type') == 'Focus':
-                focusSpellString += spellFromSpellCasting(spellCasting)
-                if spellCasting.get('fp'):
-                    focusPointBase = spellCasting.get('fp')
-            else:
-                genericSpellString += spellFromSpellCasting(spellCasting)
+    for spellCasting in beast.spellcasting:
+        if spellCasting.get('type') == 'Innate':
+            innateSpellString += spellFromSpellCasting(spellCasting)
+        elif spellCasting.get('type') == 'Focus':
+            focusSpellString += spellFromSpellCasting(spellCasting)
+            if spellCasting.get('fp'):
+                focusPointBase = spellCasting.get('fp')
+        else:
+            genericSpellString += spellFromSpellCasting(spellCasting)
     createStringTypeElement(beastBody, 'classpowers', focusSpellString)
     createStringTypeElement(beastBody, 'innatespells', innateSpellString)
     createStringTypeElement(beastBody, 'spells', genericSpellString)
     ritualString = ''
     ritualLock = False
-    if beast.get('rituals') is not None:
-        for ritual in beast.get('rituals'):
-            if ritualLock:
-                ritualString += newline
-            if ritual.get('tradition') is not None:
-                ritualString += ritual.get('tradition') + ' Rituals '
-            if ritual.get('DC') is not None:
-                ritualString += 'DC ' + str(ritual.get('DC'))
-            ritualString += spellListToString(ritual.get('rituals'))
+    for ritual in beast.rituals:
+        if ritualLock:
+            ritualString += newline
+        if ritual.get('tradition') is not None:
+            ritualString += ritual.get('tradition') + ' Rituals '
+        if ritual.get('DC') is not None:
+            ritualString += 'DC ' + str(ritual.get('DC'))
+        ritualString += spellListToString(ritual.get('rituals'))
     focusPointElementBase = ET.SubElement(beastBody, 'sp')
     createNumberTypeElement(focusPointElementBase, 'base', focusPointBase)
     createNumberTypeElement(focusPointElementBase, 'item', 0)
@@ -1147,21 +1971,14 @@ def writeSingleMonster(beast, createMonsterSpellList = False):
     createNumberTypeElement(focusPointElementBase, 'tempmod', 0)
     createNumberTypeElement(focusPointElementBase, 'total', focusPointBase)
     spellsetElement = ET.SubElement(beastBody, 'spellset')
-    if beast.get('spellcasting') and createMonsterSpellList:
-        parseMonsterSpells(spellsetElement, beast.get('spellcasting'), beast.get('level'))
-    npcID += 1
-    return npcID - 1
-
-def writeMonsters(createMonsterSpellList = False):
-    file = open('bestiary-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for beast in data:
-        writeSingleMonster(beast, createMonsterSpellList)
+    if beast.spellcasting and createMonsterSpellList:
+        with PhaseTimer('monster spellsets'):
+            parseMonsterSpells(spellsetElement, beast.spellcasting, beast.level)
+    return beastNumber
 
 def writeSingleAffliction(afflictionData):
-    global afflictionID
-    afflicitonBody = ET.SubElement(getCategory(getBody('affliction')), f'id-{afflictionID:05}')
+    afflictionNumber = idAllocator.next('affliction')
+    afflicitonBody = ET.SubElement(getCategory(getBody('affliction')), f'id-{afflictionNumber:05}')
     createStringTypeElement(afflicitonBody, 'name', afflictionData.get('name'))
     afflictionLevel = str(afflictionData.get('level') if afflictionData.get('level') else '')
     createStringTypeElement(afflicitonBody, 'traits', listToString(afflictionData.get('traits')))
@@ -1198,19 +2015,12 @@ def writeSingleAffliction(afflictionData):
             if stage.get('duration'):
                 stageString += ' (' + stage.get('duration') + ')'
             createStringTypeElement(afflicitonBody, f'stage{stageNumber}', stageString)
-    afflictionID += 1
-    return afflictionID - 1
-
-def writeAfflictions():
-    file = open('afflictions-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for afflictionData in data:
-        writeSingleAffliction(afflictionData)
+    return afflictionNumber
 
 def writeSingleHazard(hazardData):
-    global npcID
-    hazardBody = ET.SubElement(getCategory(getBody('npc')), f'id-{npcID:05}')
+    hazard = Hazard(hazardData)
+    hazardNumber = idAllocator.next('npc')
+    hazardBody = ET.SubElement(getCategory(getBody('npc')), f'id-{hazardNumber:05}')
     ET.SubElement(hazardBody, 'actions_interactionabilities')
     ET.SubElement(hazardBody, 'actions_offensiveproactive')
     ET.SubElement(hazardBody, 'actions_reactiveabilities')
@@ -1226,12 +2036,12 @@ def writeSingleHazard(hazardData):
     ET.SubElement(textElementUnused, 'p')
     miscElementUnused = ET.SubElement(hazardBody, 'miscellaneous', typeFormattedText)
     ET.SubElement(miscElementUnused, 'p')
-    createStringTypeElement(hazardBody, 'description', listToString(hazardData.get('description')))
+    createStringTypeElement(hazardBody, 'description', listToString(hazard.description))
     ET.SubElement(hazardBody, 'token', {'type' : 'token'})
-    createStringTypeElement(hazardBody, 'name', hazardData.get('name'))
-    createNumberTypeElement(hazardBody, 'level', hazardData.get('level'))
-    createStringTypeElement(hazardBody, 'traits', listToString(hazardData.get('traits')))
-    defensesDictionary = hazardData.get('defenses')
+    createStringTypeElement(hazardBody, 'name', hazard.name)
+    createNumberTypeElement(hazardBody, 'level', hazard.level)
+    createStringTypeElement(hazardBody, 'traits', listToString(hazard.traits))
+    defensesDictionary = hazard.defenses
     if defensesDictionary:
         btElement = defensesDictionary.get('bt')
         hpElement = defensesDictionary.get('hp')
@@ -1271,10 +2081,10 @@ def writeSingleHazard(hazardData):
         createStringTypeElement(hazardBody, 'weaknesses', listToString(defensesDictionary.get('weaknesses')))
         createStringTypeElement(hazardBody, 'resistances', listToString(defensesDictionary.get('resistances')))
     createStringTypeElement(hazardBody, 'spelldisplaymode', 'action')
-    createStringTypeElement(hazardBody, 'disable', entriesToString(hazardData.get('disable').get('entries')))
-    createStringTypeElement(hazardBody, 'reset', listToString(hazardData.get('reset'), newline))
-    createStringTypeElement(hazardBody, 'routine', entriesToString(hazardData.get('routine')))
-    stealthDictionary = hazardData.get('stealth')
+    createStringTypeElement(hazardBody, 'disable', entriesToString(hazard.disable))
+    createStringTypeElement(hazardBody, 'reset', listToString(hazard.reset, newline))
+    createStringTypeElement(hazardBody, 'routine', entriesToString(hazard.routine))
+    stealthDictionary = hazard.stealth
     initBonus = 0
     if stealthDictionary:
         stealthString = ''
@@ -1289,7 +2099,7 @@ def writeSingleHazard(hazardData):
             stealthString += ' ' + stringFormatter(stealthDictionary.get('notes'))
         createStringTypeElement(hazardBody, 'stealth', stealthString)
     createNumberTypeElement(hazardBody, 'init', initBonus)
-    actionsList = hazardData.get('actions')
+    actionsList = hazard.actions
     reactionsString = ''
     actionsString = ''
     rangedAttackString = ''
@@ -1310,35 +2120,25 @@ def writeSingleHazard(hazardData):
     createStringTypeElement(hazardBody, 'meleeatk', meleeAttackString)
     createStringTypeElement(hazardBody, 'rangedatk', rangedAttackString)
     createStringTypeElement(hazardBody, 'reaction', reactionsString)
-    npcID += 1
-    return npcID - 1
-
-def writeHazard():
-    file = open('hazards-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for hazardData in data:
-        writeSingleHazard(hazardData)
+    return hazardNumber
 
 def writeSingleItem(item):
-    global itemID
-    itemBody = ET.SubElement(getCategory(getBody('item')), f'id-{itemID:05}')
-    itemNameInfo = item.get('name')
+    item = Item(item)
+    itemNumber = idAllocator.next('item')
+    itemBody = ET.SubElement(getCategory(getBody('item')), f'id-{itemNumber:05}')
     createStringTypeElement(itemBody, 'nonid_name', '')
     createStringTypeElement(itemBody, 'nonidentified', '')
     createStringTypeElement(itemBody, 'effect', '')
-    if item.get('add_hash'):
-        itemNameInfo += ' (' + str(item.get('add_hash')) + ')'
-    createStringTypeElement(itemBody, 'name', itemNameInfo)
-    createStringTypeElement(itemBody, 'source', item.get('source'))
-    createStringTypeElement(itemBody, 'type', listToString(item.get('category')))
-    createStringTypeElement(itemBody, 'subtype', item.get('subCategory'))
-    createNumberTypeElement(itemBody, 'level', item.get('level'))
-    traitsString = listToString(item.get('traits'))
+    createStringTypeElement(itemBody, 'name', item.name)
+    createStringTypeElement(itemBody, 'source', item.source)
+    createStringTypeElement(itemBody, 'type', listToString(item.category))
+    createStringTypeElement(itemBody, 'subtype', item.subCategory)
+    createNumberTypeElement(itemBody, 'level', item.level)
+    traitsString = listToString(item.traits)
     
-    createStringTypeElement(itemBody, 'methodofuse', item.get('usage'))
-    createStringTypeElement(itemBody, 'bulk', item.get('bulk'))
-    activationInfo = item.get('activate')
+    createStringTypeElement(itemBody, 'methodofuse', item.usage)
+    createStringTypeElement(itemBody, 'bulk', item.bulk)
+    activationInfo = item.activate
     activationString = ''
     if activationInfo:
         if activationInfo.get('activity'):
@@ -1348,22 +2148,22 @@ def writeSingleItem(item):
         createStringTypeElement(itemBody, 'trigger', activationInfo.get('trigger'))
         createStringTypeElement(itemBody, 'requirements', activationInfo.get('requirements'))
     entriesElement = ET.SubElement(itemBody, 'description', typeFormattedText)
-    if item.get('perception'):
-        boldTextAndBody(entriesElement, 'Perception', perceptionBodyToString(item))
-    if item.get('communication'):
-        communicationListToXML(item.get('communication'), entriesElement)
-    if item.get('skills'):
-        boldTextAndBody(entriesElement, 'Skills', skillsDictToString(item.get('skills')))
-    if item.get('abilityMods'):
-        ET.SubElement(entriesElement, 'p').text = f'<b>Int: </b>{item.get("abilityMods").get("Int")} <b>Wis: </b>{item.get("abilityMods").get("Wis")} <b>Cha: </b>{item.get("abilityMods").get("Cha")}'
-    if item.get('savingThrows'):
-        boldTextAndBody(entriesElement, 'Saving Throws', savingThrowsDictToString(item.get('savingThrows')))
-    if item.get('contract'):
-        ET.SubElement(entriesElement, 'p').text = contractDictToString(item.get('contract'))
-    entriesToXML(entriesElement, item.get('entries'))
-    createStringTypeElement(itemBody, 'cost', priceDictToString(item.get('price')))
-    createStringTypeElement(itemBody, 'craftrequirements', item.get('craftReq'))
-    shieldDataInfo = item.get('shieldData')
+    if item.perception:
+        boldTextAndBody(entriesElement, 'Perception', perceptionToString(item.perception, item.senses))
+    if item.communication:
+        communicationListToXML(item.communication, entriesElement)
+    if item.skills:
+        boldTextAndBody(entriesElement, 'Skills', skillsDictToString(item.skills))
+    if item.abilityMods:
+        ET.SubElement(entriesElement, 'p').text = f'<b>Int: </b>{item.abilityMods.get("Int")} <b>Wis: </b>{item.abilityMods.get("Wis")} <b>Cha: </b>{item.abilityMods.get("Cha")}'
+    if item.savingThrows:
+        boldTextAndBody(entriesElement, 'Saving Throws', savingThrowsDictToString(item.savingThrows))
+    if item.contract:
+        ET.SubElement(entriesElement, 'p').text = contractDictToString(item.contract)
+    entriesToXML(entriesElement, item.entries)
+    createStringTypeElement(itemBody, 'cost', priceDictToString(item.price))
+    createStringTypeElement(itemBody, 'craftrequirements', item.craftReq)
+    shieldDataInfo = item.shieldData
     if shieldDataInfo:
         createNumberTypeElement(itemBody, 'speedpenalty', shieldDataInfo.get('speedPen'))
         createNumberTypeElement(itemBody, 'hardness', shieldDataInfo.get('hardness'))
@@ -1371,21 +2171,21 @@ def writeSingleItem(item):
         createNumberTypeElement(itemBody, 'itemhp', shieldDataInfo.get('hp'))
         createNumberTypeElement(itemBody, 'ac', shieldDataInfo.get('ac'))
         createNumberTypeElement(itemBody, 'acspecial', shieldDataInfo.get('ac2'))
-    if item.get('onset'):
-        activationString += ' Onset ' + item.get('onset')
+    if item.onset:
+        activationString += ' Onset ' + item.onset
     createStringTypeElement(itemBody, 'activation', activationString)
-    createStringTypeElement(itemBody, 'hands', item.get('hands'))
-    createStringTypeElement(itemBody, 'access', item.get('access'))
-    if item.get('ammunition'):
-        createStringTypeElement(itemBody, 'ammunition', listToString(item.get('ammunition')))
-    if item.get('comboWeaponData'):
+    createStringTypeElement(itemBody, 'hands', item.hands)
+    createStringTypeElement(itemBody, 'access', item.access)
+    if item.ammunition:
+        createStringTypeElement(itemBody, 'ammunition', listToString(item.ammunition))
+    if item.comboWeaponData:
         createNumberTypeElement(itemBody, 'combination_weapon', 1)
-        createStringTypeElement(itemBody, 'combination_damage', item.get('comboWeaponData').get('damage'))
-        createStringTypeElement(itemBody, 'combination_damagetype', damageTypeKey[item.get('comboWeaponData').get('damageType')])
-        createStringTypeElement(itemBody, 'combination_group', item.get('comboWeaponData').get('group'))
-        createStringTypeElement(itemBody, 'combination_traits', traitsString + ', ' + listToString(item.get('comboWeaponData').get('traits')))
-    if item.get('weaponData'):
-        weaponDataInfo = item.get('weaponData')
+        createStringTypeElement(itemBody, 'combination_damage', item.comboWeaponData.get('damage'))
+        createStringTypeElement(itemBody, 'combination_damagetype', damageTypeKey[item.comboWeaponData.get('damageType')])
+        createStringTypeElement(itemBody, 'combination_group', item.comboWeaponData.get('group'))
+        createStringTypeElement(itemBody, 'combination_traits', traitsString + ', ' + listToString(item.comboWeaponData.get('traits')))
+    if item.weaponData:
+        weaponDataInfo = item.weaponData
         createStringTypeElement(itemBody, 'damage', weaponDataInfo.get('damage'))
         createStringTypeElement(itemBody, 'damagetype', damageTypeKey[weaponDataInfo.get('damageType')])
         createStringTypeElement(itemBody, 'group', weaponDataInfo.get('group'))
@@ -1393,45 +2193,507 @@ def writeSingleItem(item):
         createNumberTypeElement(itemBody, 'reload', weaponDataInfo.get('reload'))
         createNumberTypeElement(itemBody, 'range', weaponDataInfo.get('range'))
         createStringTypeElement(itemBody, 'properties', listToString(weaponDataInfo.get('traits')))
-        if item.get('weaponData').get('traits'):
-            traitsString += ', ' + listToString(item.get('weaponData').get('traits'))
+        if weaponDataInfo.get('traits'):
+            traitsString += ', ' + listToString(weaponDataInfo.get('traits'))
     createStringTypeElement(itemBody, 'traits', traitsString)
     
-    if item.get('armorData'):
-        armorDataInfo = item.get('armorData')
+    if item.armorData:
+        armorDataInfo = item.armorData
         createNumberTypeElement(itemBody, 'ac', armorDataInfo.get('ac'))
         createNumberTypeElement(itemBody, 'armorstrength', armorDataInfo.get('str'))
         createNumberTypeElement(itemBody, 'checkpenalty', armorDataInfo.get('checkPen'))
         createNumberTypeElement(itemBody, 'maxstatbonus', armorDataInfo.get('dexCap'))
         createNumberTypeElement(itemBody, 'speedpenalty', armorDataInfo.get('speedPen'))
         createStringTypeElement(itemBody, 'group', armorDataInfo.get('group'))
-    itemID += 1
-    return itemID - 1
-
-def writeItems():
-    file = open('items-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for item in data:
-        writeSingleItem(item)
+    return itemNumber
 
 def writeSingleTrait(trait):
-    global traitID
+    traitNumber = idAllocator.next('trait')
     traitXML = getBody('trait')
     category = getCategory(traitXML)
-    traitBody = ET.SubElement(category, f'id-{traitID:05}')
+    traitBody = ET.SubElement(category, f'id-{traitNumber:05}')
     createStringTypeElement(traitBody, 'name', trait.get('name'))
     createStringTypeElement(traitBody, 'traittype', listToString(trait.get('categories')))
     traitDetails = ET.SubElement(traitBody, 'details', typeFormattedText)
     entriesToXML(traitDetails, trait.get('entries'), ['entriesOtherSource'])
-    traitID += 1
 
-def writeTraits():
-    file = open('traits-sublist-data.json')
-    data = json.load(file)
-    file.close()
-    for trait in data:
-        writeSingleTrait(trait)
+whitespacePattern = re.compile(r'\s*')
+delimiterPattern = re.compile(r'\s*[,\]]')
+
+def holdsJSONArray(fileName):
+    # Whether the first character that is not whitespace opens an array
+    with open(fileName, 'rb') as file:
+        for block in iter(lambda: file.read(4096), b''):
+            block = block.lstrip()
+            if block:
+                return block.startswith(b'[')
+    return False
+
+def iterJSONArray(fileName, blockSize=65536):
+    # Yields the records of the top level array one at a time so a huge export is never held whole
+    if not holdsJSONArray(fileName):
+        raise ValueError(fileName + ' does not hold a JSON array')
+    if ijson is not None:
+        with open(fileName, 'rb') as file:
+            yield from ijson.items(file, 'item', use_float=True)
+        return
+    decoder = json.JSONDecoder()
+    with open(fileName, encoding='utf-8') as file:
+        buffer = file.read(blockSize).lstrip()
+        while buffer == '':
+            buffer = file.read(blockSize).lstrip()
+        position = 1
+        endOfFile = False
+        # Right after [ a value or ], after a value a , or ], after a , only a value
+        expectingValue = True
+        emptyArray = True
+        while True:
+            position = whitespacePattern.match(buffer, position).end()
+            if position < len(buffer):
+                character = buffer[position]
+                if not expectingValue:
+                    if character == ']':
+                        return
+                    if character != ',':
+                        raise json.JSONDecodeError('Expecting \',\' delimiter', buffer, position)
+                    position += 1
+                    expectingValue = True
+                    continue
+                if character == ']' and emptyArray:
+                    return
+                if character in ',]':
+                    raise json.JSONDecodeError('Expecting value', buffer, position)
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                    # A number cut off by the end of the block still decodes, so only trust a value followed by , or ]
+                    if endOfFile or delimiterPattern.match(buffer, end):
+                        yield record
+                        position = end
+                        expectingValue = False
+                        emptyArray = False
+                        continue
+                except json.JSONDecodeError:
+                    if endOfFile:
+                        raise
+            elif endOfFile:
+                raise json.JSONDecodeError('Expecting value' if expectingValue else 'Expecting \',\' delimiter', buffer, position)
+            # A record larger than a block is read in ever larger pieces, so it is decoded a few times and not once per block
+            block = file.read(max(blockSize, len(buffer) - position))
+            endOfFile = not block
+            buffer = buffer[position:] + block
+            position = 0
+
+def loadRecords(fileNames):
+    return iterUniqueRecords(fileNames)
+
+def loadSpellRecords(fileNames):
+    return getSpellCatalogue().spells
+
+recordCategories = {
+    'feats' : ('feats-sublist-data.json', loadRecords, writeSingleFeat, {}),
+    'traits' : ('traits-sublist-data.json', loadRecords, writeSingleTrait, {}),
+    'backgrounds' : ('backgrounds-sublist-data.json', loadRecords, writeSingleBackground, {}),
+    'spells' : ('spells-sublist-data.json', loadSpellRecords, writeSingleSpell, {}),
+    'rituals' : ('rituals-sublist-data.json', loadRecords, writeSingleSpell, {'isRitual' : True}),
+    'monsters' : ('bestiary-sublist-data.json', loadRecords, writeSingleMonster, {}),
+    'afflictions' : ('afflictions-sublist-data.json', loadRecords, writeSingleAffliction, {}),
+    'hazards' : ('hazards-sublist-data.json', loadRecords, writeSingleHazard, {}),
+    'items' : ('items-sublist-data.json', loadRecords, writeSingleItem, {}),
+}
+
+def getConverterSettings():
+    return {'moduleName' : moduleName, 'automationEffects' : automationEffects, 'inputPaths' : inputPaths, 'categoryInputs' : categoryInputs,
+            'stableRecordIDs' : stableRecordIDs, 'timeEntryTypes' : timeEntryTypes, 'profilingEnabled' : profilingEnabled,
+            'linkTags' : linkTags}
+
+def applyConverterSettings(settings):
+    global moduleName, automationEffects, inputPaths, categoryInputs, stableRecordIDs, timeEntryTypes, profilingEnabled, linkTags
+    profilingEnabled = settings.get('profilingEnabled')
+    moduleName = settings.get('moduleName')
+    automationEffects = settings.get('automationEffects')
+    inputPaths = settings.get('inputPaths')
+    categoryInputs = settings.get('categoryInputs')
+    stableRecordIDs = settings.get('stableRecordIDs')
+    timeEntryTypes = settings.get('timeEntryTypes')
+    linkTags = settings.get('linkTags')
+
+def convertRecordChunk(categoryKey, records, options, linkedEmbeds=None):
+    # Each record gets a fresh ID allocator, the IDs are made final in mergeRecordResult. linkedEmbeds holds the
+    # embeddedRecordKeys of each record that an earlier record of the build writes.
+    global rootXML, libraryEntries, recordSpool, idAllocator
+    savedState = (rootXML, libraryEntries, recordSpool, idAllocator)
+    writeSingle, defaultOptions = recordCategories[categoryKey][2:]
+    results = []
+    try:
+        with PhaseTimer('convert ' + categoryKey, len(records)):
+            for index, record in enumerate(records):
+                rootXML = ET.Element('root')
+                libraryEntries = ET.Element('entries')
+                recordSpool = RecordCollector()
+                idAllocator = IDAllocator(stableRecordIDs)
+                idAllocator.beginRecord([categoryKey, *recordIdentity(record)])
+                if linkedEmbeds is not None:
+                    idAllocator.linkedEmbeds = linkedEmbeds[index]
+                writeSingle(record, **defaultOptions, **options)
+                if idAllocator.references:
+                    linkReferences()
+                flushRecords()
+                categoryOrder = [body.tag for body in rootXML]
+                results.append((categoryOrder, recordSpool.records, dict(idAllocator.allocated), idAllocator.embeddedRecords))
+        return results
+    finally:
+        rootXML, libraryEntries, recordSpool, idAllocator = savedState
+
+def mergeRecordResult(recordResult, categoryKey=None, record=None):
+    # With the record it was converted from, the record becomes a link target for the tags of the records merged after it
+    categoryOrder, records, usedIDs, embeddedRecords = recordResult
+    idFormat = recordIDFormat(idAllocator.stable)
+    for categoryName in categoryOrder:
+        getCategory(getBody(categoryName))
+    finalIDs = {}
+    # Embedded records an earlier record already wrote, skipped or written again, are linked to that copy
+    repeats = {}
+    for key, (categoryName, localID) in embeddedRecords.items():
+        written = idAllocator.embeddedRecords.get(key)
+        if written is not None:
+            finalIDs[(categoryName, localID)] = written[1]
+            repeats.setdefault(categoryName, []).append(localID)
+    if repeats:
+        records = [(categoryName, serializedRecord) for categoryName, serializedRecord in records
+                   if int(serializedRecord[4:serializedRecord.index(b'>')]) not in repeats.get(categoryName, ())]
+    if idAllocator.stable:
+        for categoryName, serializedRecord in records:
+            localID = int(serializedRecord[4:serializedRecord.index(b'>')])
+            finalIDs[(categoryName, localID)] = idAllocator.claim(categoryName, localID)
+    else:
+        # The record numbered its records from 1, it gets the next range of every category, closed up over the repeats
+        starts = {categoryName : idAllocator.reserve(categoryName, count - len(repeats.get(categoryName, ())))
+                  for categoryName, count in usedIDs.items() if count > len(repeats.get(categoryName, ()))}
+        for categoryName, serializedRecord in records:
+            localID = int(serializedRecord[4:serializedRecord.index(b'>')])
+            skipped = sum(1 for repeatID in repeats.get(categoryName, ()) if repeatID < localID)
+            finalIDs[(categoryName, localID)] = starts[categoryName] + localID - 1 - skipped
+    for key, (categoryName, localID) in embeddedRecords.items():
+        idAllocator.embeddedRecords.setdefault(key, (categoryName, finalIDs[(categoryName, localID)]))
+    # The record itself comes first, the records it embeds after it
+    categoryName, serializedRecord = records[0]
+    ownName = categoryName.encode() + b'.' + idFormat % finalIDs[(categoryName, int(serializedRecord[4:serializedRecord.index(b'>')]))]
+    if referenceIndex is not None and record is not None:
+        referenceIndex.add(categoryKey, record, ownName)
+
+    def finalLink(match):
+        categoryName = match.group(1).decode()
+        localID = int(match.group(2))
+        return b'recordname="%s.' % match.group(1) + idFormat % finalIDs.get((categoryName, localID), localID) + b'"'
+
+    # Links to records merged after this one are filled in when the spool is written
+    unresolvedLinks = False
+
+    def linkList(match):
+        nonlocal unresolvedLinks
+        links, final = referenceIndex.linkList(match, ownName)
+        unresolvedLinks = unresolvedLinks or not final
+        return links
+
+    for categoryName, serializedRecord in records:
+        openTagEnd = serializedRecord.index(b'>')
+        recordTag = idFormat % finalIDs[(categoryName, int(serializedRecord[4:openTagEnd]))]
+        body = serializedRecord[openTagEnd + 1:-(openTagEnd + 2)]
+        unresolvedLinks = False
+        if b'recordname="' in body:
+            body = recordLinkPattern.sub(finalLink, body)
+        if b' links="' in body:
+            body = linkListPattern.sub(linkList, body)
+        recordSpool.add(categoryName, b'<' + recordTag + b'>' + body + b'</' + recordTag + b'>', unresolvedLinks)
+
+class RecordCache:
+    # Converted records keyed by a hash of the input record and everything else that shapes the output
+    def __init__(self, path):
+        # Shards of a split build share the file, so wait for the other writers instead of failing
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS records (key TEXT PRIMARY KEY, result BLOB)')
+        self.pending = []
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        row = self.connection.execute('SELECT result FROM records WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        categoryOrder, records, usedIDs, embeddedRecords = json.loads(zlib.decompress(row[0]))
+        return (categoryOrder, [(categoryName, record.encode('utf-8')) for categoryName, record in records], usedIDs,
+                {key : tuple(written) for key, written in embeddedRecords.items()})
+
+    def put(self, key, recordResult):
+        categoryOrder, records, usedIDs, embeddedRecords = recordResult
+        encoded = json.dumps([categoryOrder, [(categoryName, record.decode('utf-8')) for categoryName, record in records], usedIDs, embeddedRecords])
+        self.pending.append((key, zlib.compress(encoded.encode('utf-8'))))
+
+    def commit(self):
+        if self.pending:
+            self.connection.executemany('INSERT OR REPLACE INTO records (key, result) VALUES (?, ?)', self.pending)
+            self.connection.commit()
+            self.pending = []
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+def hashFile(*fileNames):
+    digest = hashlib.sha256()
+    for fileName in fileNames:
+        if os.path.exists(fileName):
+            with open(fileName, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()
+
+def getCacheContext():
+    # Creature records also depend on the automation table and, through their spellsets, on the spell list
+    baseContext = hashFile(os.path.abspath(__file__)) + moduleName + ('|stable' if stableRecordIDs else '') + ('|links' if linkTags else '')
+    automationContext = hashlib.sha256(json.dumps(automationEffects, sort_keys=True).encode('utf-8')).hexdigest()
+    spellContext = hashFile(*getSpellCatalogue().fileNames)
+    return baseContext, automationContext, spellContext
+
+def recordCacheKey(cacheContext, categoryKey, options, record, linkedEmbeds=()):
+    baseContext, automationContext, spellContext = cacheContext
+    canonicalRecord = json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    digest = hashlib.sha256()
+    digest.update((baseContext + categoryKey + json.dumps(options, sort_keys=True)).encode('utf-8'))
+    if categoryKey == 'monsters' or '"tag":"creature"' in canonicalRecord:
+        digest.update(automationContext.encode('utf-8'))
+    if '"spellcasting":' in canonicalRecord:
+        digest.update(spellContext.encode('utf-8'))
+    digest.update(canonicalRecord.encode('utf-8'))
+    # A record converted without the embedded records others write is cached apart from the full conversion
+    if linkedEmbeds:
+        digest.update(json.dumps(sorted(linkedEmbeds)).encode('utf-8'))
+    return digest.hexdigest()
+
+def normalizedRecord(categoryKey, record):
+    # The fields prep tools search on, pulled out of the export once, with the whole record next to them
+    if categoryKey == 'monsters':
+        traits = creatureTraits(record)
+    else:
+        traits = record.get('traits') or []
+    level = record.get('level')
+    # formatTaggedString and not stringFormatter, the sinks must not add links to the record being converted
+    return {'category' : categoryKey, 'name' : record.get('name'), 'source' : recordSource(record),
+            'level' : level if type(level) is int else None, 'traits' : [formatTaggedString(trait) for trait in traits if type(trait) is str],
+            'record' : record}
+
+class JSONLinesSink:
+    # One normalized record per line
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def addRecords(self, categoryKey, records):
+        for record in records:
+            self.file.write(json.dumps(normalizedRecord(categoryKey, record), ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+class SQLiteSink:
+    # The normalized records in a table of their own and their traits in a second one, rebuilt on every run
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript('''
+            DROP TABLE IF EXISTS record_traits;
+            DROP TABLE IF EXISTS records;
+            CREATE TABLE records (id INTEGER PRIMARY KEY, category TEXT, name TEXT, source TEXT, level INTEGER, traits TEXT, data TEXT);
+            CREATE TABLE record_traits (record INTEGER REFERENCES records (id), trait TEXT);
+        ''')
+        self.nextID = 1
+
+    def addRecords(self, categoryKey, records):
+        rows = []
+        traitRows = []
+        for record in records:
+            normalized = normalizedRecord(categoryKey, record)
+            rows.append((self.nextID, categoryKey, normalized['name'], normalized['source'], normalized['level'],
+                         json.dumps(normalized['traits'], ensure_ascii=False), json.dumps(record, ensure_ascii=False)))
+            traitRows.extend((self.nextID, trait) for trait in normalized['traits'])
+            self.nextID += 1
+        self.connection.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        self.connection.executemany('INSERT INTO record_traits VALUES (?, ?)', traitRows)
+
+    def close(self):
+        # Indexing once after the inserts is faster than keeping the indexes up to date row by row
+        self.connection.executescript('''
+            CREATE INDEX records_name ON records (name COLLATE NOCASE);
+            CREATE INDEX records_level ON records (category, level);
+            CREATE INDEX record_traits_trait ON record_traits (trait COLLATE NOCASE, record);
+        ''')
+        self.connection.commit()
+        self.connection.close()
+
+def exportRecords(selectedCategories):
+    # Reads the categories for the record sinks alone, without converting them into a module
+    for chunk in iterRecordChunks(selectedCategories):
+        pass
+
+def iterRecordChunks(selectedCategories):
+    for categoryKey, options in selectedCategories:
+        loader = recordCategories[categoryKey][1]
+        records = iter(loader(categoryFiles(categoryKey)))
+        if recordSourceFilter is not None:
+            records = (record for record in records if recordSource(record) in recordSourceFilter)
+        while True:
+            with PhaseTimer('load ' + categoryKey) as timer:
+                chunk = list(itertools.islice(records, recordsPerChunk))
+                timer.records = len(chunk)
+            if not chunk:
+                break
+            if recordSinks:
+                with PhaseTimer('export records', len(chunk)):
+                    for sink in recordSinks:
+                        sink.addRecords(categoryKey, chunk)
+            yield categoryKey, chunk, options
+
+def convertRecordChunkInWorker(categoryKey, records, options, linkedEmbeds):
+    entryTypeStats.clear()
+    phaseStats.clear()
+    return convertRecordChunk(categoryKey, records, options, linkedEmbeds), dict(entryTypeStats), dict(phaseStats)
+
+class PendingChunk:
+    def __init__(self, categoryKey, records, options, recordCache, cacheContext, embeddedKeys):
+        self.categoryKey = categoryKey
+        self.options = options
+        self.records = records
+        # The workers cannot share the embedded records written so far, so the chunks are handed the embedded records
+        # of earlier records, in merge order, before they are converted. Those are linked instead of converted again.
+        self.linkedEmbeds = []
+        for record in records:
+            keys = embeddedRecordKeys(record, [])
+            self.linkedEmbeds.append(embeddedKeys.intersection(keys))
+            embeddedKeys.update(keys)
+        self.keys = [None] * len(records)
+        self.results = [None] * len(records)
+        self.missingRecords = records
+        self.missingLinkedEmbeds = self.linkedEmbeds
+        if recordCache is not None:
+            self.keys = [recordCacheKey(cacheContext, categoryKey, options, record, linkedEmbeds)
+                         for record, linkedEmbeds in zip(records, self.linkedEmbeds)]
+            self.results = [recordCache.get(key) for key in self.keys]
+            self.missingRecords = [record for record, result in zip(records, self.results) if result is None]
+            self.missingLinkedEmbeds = [linkedEmbeds for linkedEmbeds, result in zip(self.linkedEmbeds, self.results) if result is None]
+        self.converted = None
+        self.future = None
+
+    def convert(self, executor=None):
+        if not self.missingRecords:
+            return
+        if executor is None:
+            self.converted = convertRecordChunk(self.categoryKey, self.missingRecords, self.options, self.missingLinkedEmbeds)
+        else:
+            self.future = executor.submit(convertRecordChunkInWorker, self.categoryKey, self.missingRecords, self.options, self.missingLinkedEmbeds)
+
+    def merge(self, recordCache):
+        if self.future is not None:
+            self.converted, workerEntryTypeStats, workerPhaseStats = self.future.result()
+            mergeEntryTypeStats(workerEntryTypeStats)
+            mergePhaseStats(workerPhaseStats)
+        if self.missingRecords:
+            converted = iter(self.converted)
+        with PhaseTimer('merge records', len(self.results)):
+            for index, result in enumerate(self.results):
+                if result is None:
+                    result = next(converted)
+                    if recordCache is not None:
+                        recordCache.put(self.keys[index], result)
+                linkedEmbeds = self.linkedEmbeds[index]
+                if linkedEmbeds and any(key in linkedEmbeds and key not in idAllocator.embeddedRecords for key in result[3]):
+                    # The earlier record did not write an embedded record after all, this one writes it itself
+                    result = convertRecordChunk(self.categoryKey, [self.records[index]], self.options)[0]
+                mergeRecordResult(result, self.categoryKey, self.records[index])
+            if recordCache is not None:
+                recordCache.commit()
+
+def convertCategories(selectedCategories, jobs=1):
+    recordCache = None
+    cacheContext = None
+    if recordCachePath:
+        recordCache = RecordCache(recordCachePath)
+        cacheContext = getCacheContext()
+    embeddedKeys = set()
+    chunks = (PendingChunk(*chunk, recordCache, cacheContext, embeddedKeys) for chunk in iterRecordChunks(selectedCategories))
+    try:
+        if jobs <= 1:
+            for chunk in chunks:
+                chunk.convert()
+                chunk.merge(recordCache)
+            return
+        # Chunks are merged strictly in submission order so the IDs match a single process run
+        with concurrent.futures.ProcessPoolExecutor(jobs, initializer=applyConverterSettings, initargs=(getConverterSettings(),)) as executor:
+            pending = collections.deque()
+            for chunk in chunks:
+                chunk.convert(executor)
+                pending.append(chunk)
+                if len(pending) >= jobs * 2:
+                    pending.popleft().merge(recordCache)
+            while pending:
+                pending.popleft().merge(recordCache)
+    finally:
+        if recordCache is not None:
+            print(f'Record cache: {recordCache.hits} reused, {recordCache.misses} converted')
+            recordCache.close()
+
+def selectCategoriesInteractively():
+    selectedCategories = []
+    createMonsterSpellList = True
+
+    if categoryFiles('feats'):
+        if input('Parse Feats (Y)? ') == 'Y':
+            selectedCategories.append(('feats', {}))
+    
+    if categoryFiles('traits'):
+        if input('Parse Traits (Y)?') == 'Y':
+            selectedCategories.append(('traits', {}))
+
+    if categoryFiles('backgrounds'):
+        if input('Parse Backgrounds (Y)? ') == 'Y':
+            selectedCategories.append(('backgrounds', {}))
+
+    if categoryFiles('spells'):
+        if input('Parse Spells (Y)? ') == 'Y':
+            selectedCategories.append(('spells', {}))
+
+    if categoryFiles('rituals'):
+        if input('Parse Rituals (Y)? ') == 'Y':
+            selectedCategories.append(('rituals', {}))
+
+    if categoryFiles('monsters'):
+        if input('Parse Monsters (Y)? ') == 'Y':
+            if not categoryFiles('spells'):
+                while not categoryFiles('spells'):
+                    if input('In order to parse the spells, you need the JSON File.  Would you like to skip parsing the spells? Y/n: ') == 'Y':
+                        createMonsterSpellList = False
+                        break
+                    input('Please drop in the spells-sublist-data.json file and then press enter')
+            else:
+                if categoryFiles('monsters'):
+                    createSpellsInput = input('Spell json detected.  Would you like to parse to the monsters spells list? Y/n: ')
+                    if createSpellsInput != 'Y':
+                        createMonsterSpellList = False
+                else:
+                    createMonsterSpellList = False
+            selectedCategories.append(('monsters', {'createMonsterSpellList' : createMonsterSpellList}))
+
+    if categoryFiles('afflictions'):
+        if input('Parse Afflictions (Y)? ') == 'Y':
+            selectedCategories.append(('afflictions', {}))
+
+    if categoryFiles('hazards'):
+        if input('Parse Hazards (Y)? ') == 'Y':
+            selectedCategories.append(('hazards', {}))
+
+    if categoryFiles('items'):
+        if input('Parse Items (Y)? ') == 'Y':
+            selectedCategories.append(('items', {}))
+    return selectedCategories
 
 def writeDefinition(root, naming):
     nameBody = ET.SubElement(root, 'name')
@@ -1449,6 +2711,48 @@ def zipping(db, definition, name):
         file.write(definition)
     print('Module Written')
 
+def planModuleShards(selectedCategories, splitBy):
+    # Shard name -> (categories it converts, source books it keeps or None for all of them)
+    shards = {}
+    if splitBy == 'category':
+        for categoryKey, options in selectedCategories:
+            shards[categoryKey.capitalize()] = ([(categoryKey, options)], None)
+        return shards
+    for categoryKey, options in selectedCategories:
+        loader = recordCategories[categoryKey][1]
+        for source in dict.fromkeys(recordSource(record) for record in loader(categoryFiles(categoryKey))):
+            shards.setdefault(source, ([], {source}))[0].append((categoryKey, options))
+    return shards
+
+def buildModuleShard(settings, shardName, selectedCategories, sources, path, compressionLevel):
+    global moduleName, recordSourceFilter, conversionJobs, recordCachePath
+    applyConverterSettings(settings)
+    moduleName = settings.get('moduleName') + ' ' + shardName
+    recordSourceFilter = sources
+    recordCachePath = settings.get('recordCachePath')
+    conversionJobs = 1
+    entryTypeStats.clear()
+    phaseStats.clear()
+    writeModule(moduleName, compressionLevel, selectedCategories, path)
+    return dict(entryTypeStats), dict(phaseStats)
+
+def writeModuleShards(splitBy, selectedCategories, path, compressionLevel=None, jobs=1):
+    # One module per category or source book, each with its own library and definition.xml, built side by side
+    shards = planModuleShards(selectedCategories, splitBy)
+    settings = dict(getConverterSettings(), recordCachePath=recordCachePath)
+    stem = os.path.splitext(path)[0]
+    paths = []
+    with concurrent.futures.ProcessPoolExecutor(max(1, min(jobs, len(shards)))) as executor:
+        futures = []
+        for shardName, (shardCategories, sources) in shards.items():
+            paths.append(stem + '-' + re.sub(r'[^\w.-]+', '_', shardName) + '.mod')
+            futures.append(executor.submit(buildModuleShard, settings, shardName, shardCategories, sources, paths[-1], compressionLevel))
+        for future in futures:
+            workerEntryTypeStats, workerPhaseStats = future.result()
+            mergeEntryTypeStats(workerEntryTypeStats)
+            mergePhaseStats(workerPhaseStats)
+    return paths
+
 def openGameLicenseStory(rootXML):
     licenseBody = ET.SubElement(rootXML, 'id-00001')
     nameBody = ET.SubElement(licenseBody, 'name', typeString)
@@ -1458,7 +2762,7 @@ def openGameLicenseStory(rootXML):
     heading.text = 'Open Game License'
     preface = ET.SubElement(licenseBody, 'p')
     preface.text = 'The following text is the property of Wizards of the Coast, Inc. and is Copyright 2000 Wizards of the Coast, Inc ("Wizards"). All Rights Reserved.'
-    with open('OGL.txt') as text:
+    with open(resourcePath('OGL.txt')) as text:
         for line in text:
             body = ET.SubElement(textBody, 'p')
             body.text = line
@@ -1473,13 +2777,14 @@ def usageRequirementsStory(rootXML):
     textBody = ET.SubElement(licenseBody, 'text', typeFormattedText)
     heading = ET.SubElement(textBody, 'h')
     heading.text = 'This Fantasy Grounds library module uses trademarks'
-    with open('UsageRequirement.txt') as text:
+    with open(resourcePath('UsageRequirement.txt')) as text:
         for line in text:
             body = ET.SubElement(textBody, 'p')
             body.text = line
 
-def writeDBFile():
-    global rootXML
+def writeDBFile(output=None, selectedCategories=None):
+    global rootXML, idAllocator
+    idAllocator = IDAllocator(stableRecordIDs)
     rootXML = ET.Element(
         'root', {'version': '4.1', 'dataversion': '20210708', 'release': '18|CoreRPG:4.1'})
     library = ET.SubElement(rootXML, 'library')
@@ -1488,6 +2793,8 @@ def writeDBFile():
     nameElement = ET.SubElement(modulesSubElement, 'name', typeString)
     global libraryEntries
     libraryEntries = ET.SubElement(modulesSubElement, 'entries')
+    global recordSpool
+    recordSpool = RecordSpool()
     nameElement.text = moduleName
     storyEntries = ET.SubElement(rootXML, 'encounter')
 
@@ -1495,69 +2802,41 @@ def writeDBFile():
     usageRequirementsStory(storyEntries)
     writeLibraryEntries('story')  
 
-    createMonsterSpellList = True
-
-    if os.path.exists('feats-sublist-data.json'):
-        if input('Parse Feats (Y)? ') == 'Y':
-            writeFeats()
-    
-    if os.path.exists('traits-sublist-data.json'):
-        if input('Parse Traits (Y)?') == 'Y':
-            writeTraits()
-
-    if os.path.exists('backgrounds-sublist-data.json'):
-        if input('Parse Backgrounds (Y)? ') == 'Y':
-            writeBackgrounds()
-
-    if os.path.exists('spells-sublist-data.json'):
-        if input('Parse Spells (Y)? ') == 'Y':
-            writeSpells()
-
-    if os.path.exists('rituals-sublist-data.json'):
-        if input('Parse Rituals (Y)? ') == 'Y':
-            writeRituals()
-
-    if os.path.exists('bestiary-sublist-data.json'):
-        if input('Parse Monsters (Y)? ') == 'Y':
-            if os.path.exists('spells-sublist-data.json') == False:
-                while os.path.exists('spells-sublist-data.json') == False:
-                    if input('In order to parse the spells, you need the JSON File.  Would you like to skip parsing the spells? Y/n: ') == 'Y':
-                        createMonsterSpellList = False
-                        break
-                    input('Please drop in the spells-sublist-data.json file and then press enter')
-            else:
-                if os.path.exists('bestiary-sublist-data.json'):
-                    createSpellsInput = input('Spell json detected.  Would you like to parse to the monsters spells list? Y/n: ')
-                    if createSpellsInput != 'Y':
-                        createMonsterSpellList = False
-                else:
-                    createMonsterSpellList = False
-            writeMonsters(createMonsterSpellList)
-
-    if os.path.exists('afflictions-sublist-data.json'):
-        if input('Parse Afflictions (Y)? ') == 'Y':
-            writeAfflictions()
-
-    if os.path.exists('hazards-sublist-data.json'):
-        if input('Parse Hazards (Y)? ') == 'Y':
-            writeHazard()
-
-    if os.path.exists('items-sublist-data.json'):
-        if input('Parse Items (Y)? ') == 'Y':
-            writeItems()
-
-    tree = ET.ElementTree(rootXML)
-    ET.indent(tree, '\t', level=0)
+    if selectedCategories is None:
+        selectedCategories = selectCategoriesInteractively()
+        if 'monsters' in dict(selectedCategories):
+            matchAutomationToCreatures(categoryFiles('monsters'))
+    global referenceIndex, linkTags
+    referenceIndex = ReferenceIndex()
+    linkTags = True
+    convertCategories(selectedCategories, conversionJobs)
+
+    with PhaseTimer('write db.xml'):
+        writeDBFileTail(output)
+
+def writeDBFileTail(output):
+    flushRecords()
+    # Only the module skeleton is serialized here, the records are copied in from the spool
+    for body in rootXML:
+        category = body.find('category')
+        if category is not None and recordSpool.hasRecords(body.tag):
+            category.text = '@@spool:' + body.tag + '@@'
+    skeleton = serializeElement(rootXML, 0, True)
+    if output is None:
+        with open('db.xml', 'wb') as files:
+            writeSkeletonWithRecords(skeleton, files)
+    else:
+        writeSkeletonWithRecords(skeleton, output)
+    recordSpool.close()
 
-    with open('db.xml', 'wb') as files:
-        ET.indent(rootXML, level=0)
-        replaced = ET.tostring(rootXML, encoding='utf-8', method='xml', xml_declaration=True).replace(b'[a]&amp;', b'&')
-        replaced = replaced.replace(b'&lt;', b'<')
-        replaced = replaced.replace(b'&gt;', b'>')
-        replaced = replaced.replace(b'[newline]', b'\n')
-        files.write(replaced)
+def writeSkeletonWithRecords(skeleton, output):
+    for index, part in enumerate(re.split(rb'@@spool:(\w+)@@', skeleton)):
+        if index % 2 == 0:
+            output.write(part)
+        else:
+            recordSpool.writeInto(part.decode(), output)
 
-def writeDefinitionFile():
+def writeDefinitionFile(output=None):
     rootXML = ET.Element(
         'root', {'version': '4.1', 'dataversion': '20210708', 'release': '18|CoreRPG:4.1'})
 
@@ -1566,8 +2845,28 @@ def writeDefinitionFile():
     tree = ET.ElementTree(rootXML)
     ET.indent(tree, '\t', level=0)
 
-    with open('definition.xml', 'wb') as files:
-        tree.write(files, encoding='utf-8', xml_declaration=True)
+    if output is None:
+        with open('definition.xml', 'wb') as files:
+            tree.write(files, encoding='utf-8', xml_declaration=True)
+    else:
+        tree.write(output, encoding='utf-8', xml_declaration=True)
+
+def writeModule(name, compressionLevel=None, selectedCategories=None, path=None, quiet=False):
+    # Writes db.xml and definition.xml into the .mod archive, without loose files in the working directory.
+    # The records of large categories pass through RecordSpool's temporary files on the way.
+    # quiet leaves stdout alone for library callers like the server.
+    if compressionLevel is None:
+        compressionLevel = moduleCompressionLevel
+    if path is None:
+        path = name + '.mod'
+    compression = zipfile.ZIP_DEFLATED if compressionLevel else zipfile.ZIP_STORED
+    with zipfile.ZipFile(path, 'w', compression, compresslevel=compressionLevel or None) as file:
+        with file.open('db.xml', 'w') as dbFile:
+            writeDBFile(dbFile, selectedCategories)
+        with file.open('definition.xml', 'w') as definitionFile:
+            writeDefinitionFile(definitionFile)
+    if not quiet:
+        print('Module Written')
 
 def main():
     if not os.path.exists('OGL.txt'):
@@ -1589,12 +2888,146 @@ def main():
     if len(newName) > 0:
         moduleName = str(newName)
 
-    writeDBFile()
-    writeDefinitionFile()
+    if keepIntermediateFiles:
+        writeDBFile()
+        writeDefinitionFile()
+        zipping(os.path.relpath('db.xml'), os.path.relpath('definition.xml'), moduleName)
+    else:
+        writeModule(moduleName)
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description='Convert pf2etools sublist JSON exports into a Fantasy Grounds module without any prompts. Run without arguments for the interactive mode.')
+    parser.add_argument('--accept-license', action='store_true', help='agree to the OGL and the Paizo Community Use Policy (required)')
+    parser.add_argument('-i', '--input-dir', action='append', metavar='PATH', help='folder or glob pattern of *-sublist-data*.json exports, repeat it to combine books and homebrew (default: .)')
+    parser.add_argument('--add', action='append', default=[], metavar='CATEGORY=GLOB', help='extra exports for one category that do not follow the file naming, e.g. monsters=homebrew/*.json')
+    parser.add_argument('-o', '--output', help='path of the .mod file to write (default: <module name>.mod)')
+    parser.add_argument('-n', '--module-name', default=moduleName, help='name of the module inside Fantasy Grounds')
+    parser.add_argument('-c', '--categories', help='comma separated categories to convert (default: every category with a file). Choices: ' + ', '.join(recordCategories))
+    parser.add_argument('--no-monster-spells', action='store_true', help='do not build creature spellsets from the spell list')
+    parser.add_argument('-a', '--automation', help='ShadeRaven automation tracker exported as CSV')
+    parser.add_argument('--automation-report', help='CSV file listing the automation rows that matched no creature ability')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes used for conversion')
+    parser.add_argument('--compression-level', type=int, default=moduleCompressionLevel, choices=range(0, 10), help='0 stores, 1-9 deflates the module files')
+    parser.add_argument('--stable-ids', action='store_true', help='derive record IDs from name, source and add_hash so rebuilds keep them when records are added or removed')
+    parser.add_argument('--cache', help='sqlite file used to reuse records that did not change since the last build')
+    parser.add_argument('--keep-xml', action='store_true', help='also write db.xml and definition.xml next to the module')
+    parser.add_argument('--jsonl', metavar='PATH', help='also write every record, normalized, as JSON lines')
+    parser.add_argument('--sqlite', metavar='PATH', help='also write every record, normalized, to a SQLite database indexed on name, level and traits')
+    parser.add_argument('--no-module', action='store_true', help='only write the --jsonl and --sqlite outputs')
+    parser.add_argument('--split', choices=['category', 'source'], help='write one smaller module per category or per source book, -j of them at a time')
+    parser.add_argument('--profile', action='store_true', help='print time, records/sec and peak memory for every conversion phase')
+    parser.add_argument('--profile-output', help='with --profile, also save the statistics: .json for the phase table, anything else for cProfile data')
+    return parser.parse_args(argv)
+
+def selectCategoriesFromArguments(arguments):
+    if arguments.categories:
+        categoryKeys = [key.strip() for key in arguments.categories.split(',') if key.strip()]
+        for key in categoryKeys:
+            if key not in recordCategories:
+                raise SystemExit('Unknown category ' + key + '. Choices: ' + ', '.join(recordCategories))
+            if not categoryFiles(key):
+                raise SystemExit('Missing ' + recordCategories[key][0] + ' in ' + ', '.join(inputPaths))
+    else:
+        categoryKeys = [key for key in recordCategories if categoryFiles(key)]
+    createMonsterSpellList = not arguments.no_monster_spells and bool(categoryFiles('spells'))
+    selectedCategories = []
+    for key in recordCategories:
+        if key in categoryKeys:
+            selectedCategories.append((key, {'createMonsterSpellList' : createMonsterSpellList} if key == 'monsters' else {}))
+    return selectedCategories
+
+def runBatch(arguments):
+    global moduleName, inputPaths, categoryInputs, conversionJobs, keepIntermediateFiles, recordCachePath, stableRecordIDs, timeEntryTypes, profilingEnabled
+    if not arguments.accept_license:
+        raise SystemExit('Converting requires agreeing to the OGL and the Usage Requirements, pass --accept-license')
+    moduleName = arguments.module_name
+    inputPaths = arguments.input_dir or ['.']
+    categoryInputs = {}
+    for addition in arguments.add:
+        categoryKey, separator, pattern = addition.partition('=')
+        if not separator or categoryKey not in recordCategories:
+            raise SystemExit('--add expects CATEGORY=GLOB with one of: ' + ', '.join(recordCategories))
+        categoryInputs.setdefault(categoryKey, []).append(pattern)
+    conversionJobs = arguments.jobs
+    keepIntermediateFiles = arguments.keep_xml
+    recordCachePath = arguments.cache
+    stableRecordIDs = arguments.stable_ids
+    if arguments.automation:
+        createAutomation(arguments.automation)
+    selectedCategories = selectCategoriesFromArguments(arguments)
+    if not selectedCategories:
+        raise SystemExit('Nothing to convert in ' + ', '.join(inputPaths))
+    if arguments.automation and 'monsters' in dict(selectedCategories):
+        matchAutomationToCreatures(categoryFiles('monsters'), arguments.automation_report)
+    outputPath = arguments.output or moduleName + '.mod'
+    if arguments.split and keepIntermediateFiles:
+        raise SystemExit('--keep-xml cannot be combined with --split')
+    if arguments.split and (arguments.jsonl or arguments.sqlite):
+        raise SystemExit('--jsonl and --sqlite cannot be combined with --split')
+    if arguments.no_module and not (arguments.jsonl or arguments.sqlite):
+        raise SystemExit('--no-module needs --jsonl or --sqlite')
+
+    def build():
+        recordSinks.clear()
+        if arguments.jsonl:
+            recordSinks.append(JSONLinesSink(arguments.jsonl))
+        if arguments.sqlite:
+            recordSinks.append(SQLiteSink(arguments.sqlite))
+        try:
+            writeOutputs()
+        finally:
+            for sink in recordSinks:
+                sink.close()
+            recordSinks.clear()
+
+    def writeOutputs():
+        if arguments.no_module:
+            exportRecords(selectedCategories)
+        elif arguments.split:
+            writeModuleShards(arguments.split, selectedCategories, outputPath, arguments.compression_level, conversionJobs)
+        elif keepIntermediateFiles:
+            writeDBFile(selectedCategories=selectedCategories)
+            writeDefinitionFile()
+            zipping(os.path.relpath('db.xml'), os.path.relpath('definition.xml'), os.path.splitext(outputPath)[0])
+        else:
+            writeModule(moduleName, arguments.compression_level, selectedCategories, outputPath)
 
-    zipping(os.path.relpath('db.xml'), os.path.relpath('definition.xml'), moduleName)
+    if not arguments.profile:
+        build()
+        return
+    timeEntryTypes = True
+    profilingEnabled = True
+    profileOutput = arguments.profile_output
+    profiler = None
+    if profileOutput and not profileOutput.endswith('.json'):
+        profiler = cProfile.Profile()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.runcall(build)
+    else:
+        build()
+    totalSeconds = time.perf_counter() - start
+    print(phaseStatsReport(totalSeconds))
+    if arguments.split:
+        print('Phases are summed over every module of the split build')
+    elif conversionJobs > 1:
+        print('Convert, serialize and spellset phases are summed over ' + str(conversionJobs) + ' worker processes')
+    print(entryTypeStatsReport())
+    if profiler is not None:
+        profiler.dump_stats(profileOutput)
+        print('cProfile data written to ' + profileOutput + ' (python -m pstats ' + profileOutput + ')')
+    elif profileOutput:
+        with open(profileOutput, 'w') as file:
+            json.dump({'totalSeconds' : totalSeconds, 'jobs' : conversionJobs, 'peakRSSKB' : buildPeakMemoryKB(),
+                       'phases' : {name : {'seconds' : seconds, 'records' : records, 'peakRSSGrowthKB' : peakGrowthKB}
+                                   for name, (seconds, records, peakGrowthKB) in phaseStats.items()},
+                       'entryTypes' : {str(entryType) : {'count' : count, 'seconds' : seconds} for entryType, (count, seconds) in entryTypeStats.items()}}, file, indent=1)
+        print('Profile statistics written to ' + profileOutput)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        runBatch(parseArguments(sys.argv[1:]))
+        sys.exit()
     if input('Use ShadeRaven Automated Google Sheet for automation (https://docs.google.com/spreadsheets/d/14T4SN__GeuOyYg7Hs6MnTGZraOHtfwNyqESRs9VRRyE/edit#gid=0 follow link to download it as a csv)? Y/n ').lower() == 'y':
         createAutomation()
     main()
@@ -0,0 +1,162 @@
+import argparse
+import collections
+import http.server
+import io
+import json
+import threading
+import time
+import urllib.parse
+
+import converter
+
+# Latencies kept per endpoint for the percentiles in /metrics
+latencyWindow = 2048
+
+class LatencyMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # Endpoint -> [requests, errors, recent latencies in seconds]
+        self.endpoints = {}
+
+    def record(self, endpoint, seconds, failed):
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, [0, 0, collections.deque(maxlen=latencyWindow)])
+            stats[0] += 1
+            stats[1] += failed
+            stats[2].append(seconds)
+
+    def report(self):
+        with self.lock:
+            endpoints = {endpoint : (requests, errors, sorted(latencies)) for endpoint, (requests, errors, latencies) in self.endpoints.items()}
+        report = {'uptimeSeconds' : round(time.time() - self.started, 1), 'endpoints' : {}}
+        for endpoint, (requests, errors, latencies) in endpoints.items():
+            def percentile(fraction):
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 3)
+            report['endpoints'][endpoint] = {'requests' : requests, 'errors' : errors, 'meanMs' : round(sum(latencies) / len(latencies) * 1000, 3),
+                                             'p50Ms' : percentile(0.5), 'p95Ms' : percentile(0.95), 'p99Ms' : percentile(0.99), 'maxMs' : percentile(1)}
+        return report
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ConversionHandler(http.server.BaseHTTPRequestHandler):
+    # POST /convert/<category>[?format=text] with one record or a list of them, POST /module with
+    # {"name": ..., "categories": {<category>: [records]}}, GET /metrics and GET /health
+    protocol_version = 'HTTP/1.1'
+    converter = None
+    metrics = None
+
+    def do_GET(self):
+        self.respond('GET')
+
+    def do_POST(self):
+        self.respond('POST')
+
+    def respond(self, method):
+        start = time.perf_counter()
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        endpoint = method + ' /' + (parts[0] if parts else '')
+        failed = True
+        try:
+            if method == 'GET' and parts == ['health']:
+                self.sendJSON({'status' : 'ok'})
+            elif method == 'GET' and parts == ['metrics']:
+                self.sendJSON(dict(self.metrics.report(), caches=self.converter.cacheReport()))
+            elif method == 'POST' and len(parts) == 2 and parts[0] == 'convert':
+                self.convert(parts[1], urllib.parse.parse_qs(url.query).get('format', ['xml'])[0])
+            elif method == 'POST' and parts == ['module']:
+                self.buildModule()
+            else:
+                raise RequestError(404, 'Unknown endpoint ' + method + ' ' + url.path)
+            failed = False
+        except RequestError as error:
+            self.sendJSON({'error' : str(error)}, error.status)
+        except ValueError as error:
+            self.sendJSON({'error' : str(error)}, 400)
+        except Exception as error:
+            self.sendJSON({'error' : type(error).__name__ + ': ' + str(error)}, 500)
+        finally:
+            self.metrics.record(endpoint, time.perf_counter() - start, failed)
+
+    def log_message(self, format, *args):
+        pass
+
+    def readJSON(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise RequestError(400, 'The request body is not valid JSON')
+
+    def sendBody(self, body, contentType, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def sendJSON(self, data, status=200):
+        self.sendBody(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8', status)
+
+    def convert(self, categoryKey, outputFormat):
+        posted = self.readJSON()
+        records = posted if type(posted) is list else [posted]
+        if not all(type(record) is dict for record in records):
+            raise RequestError(400, 'Post one record object or a list of them')
+        if outputFormat == 'text':
+            results = [{'text' : self.converter.convertRecordText(categoryKey, record)} for record in records]
+        elif outputFormat == 'xml':
+            results = [{'fragments' : [{'category' : fragment.categoryName, 'xml' : fragment.xml.decode('utf-8')}
+                                       for fragment in self.converter.convertRecord(categoryKey, record)]} for record in records]
+        else:
+            raise RequestError(400, 'format is xml or text')
+        self.sendJSON(results if type(posted) is list else results[0])
+
+    def buildModule(self):
+        posted = self.readJSON()
+        if type(posted) is not dict or type(posted.get('categories')) is not dict:
+            raise RequestError(400, 'Post {"name": ..., "categories": {<category>: [records]}}')
+        output = io.BytesIO()
+        self.converter.buildModule(posted['categories'], output, posted.get('name'))
+        self.sendBody(output.getvalue(), 'application/zip')
+
+def createServer(pf2eConverter, host='127.0.0.1', port=8765):
+    # pf2eConverter is a Converter, which converts one request at a time, or a ConverterPool
+    handler = type('BoundConversionHandler', (ConversionHandler,), {'converter' : pf2eConverter, 'metrics' : LatencyMetrics()})
+    return http.server.ThreadingHTTPServer((host, port), handler)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve record conversions and module builds over HTTP, with the spell list and automation kept in memory')
+    parser.add_argument('--accept-license', action='store_true', help='agree to the OGL and the Paizo Community Use Policy (required)')
+    parser.add_argument('-i', '--input-dir', action='append', metavar='PATH', help='folder or glob pattern of the exports creature spellsets are built from (default: .)')
+    parser.add_argument('-n', '--module-name', default='pf2e_tools', help='name of the built modules inside Fantasy Grounds')
+    parser.add_argument('-a', '--automation', help='ShadeRaven automation tracker exported as CSV')
+    parser.add_argument('--stable-ids', action='store_true', help='derive record IDs from name, source and add_hash')
+    parser.add_argument('-w', '--workers', type=int, default=2,
+                        help='worker processes converting side by side, module builds leave one free for single records; 0 converts in the server process, one request at a time (default: 2)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    arguments = parser.parse_args()
+    if not arguments.accept_license:
+        raise SystemExit('Converting requires agreeing to the OGL and the Usage Requirements, pass --accept-license')
+    converterArguments = {'inputPaths' : arguments.input_dir, 'moduleName' : arguments.module_name, 'automationFileName' : arguments.automation,
+                          'stableRecordIDs' : arguments.stable_ids}
+    if arguments.workers > 0:
+        pf2eConverter = converter.ConverterPool(arguments.workers, **converterArguments)
+    else:
+        pf2eConverter = converter.Converter(**converterArguments)
+        pf2eConverter.warm()
+    server = createServer(pf2eConverter, arguments.host, arguments.port)
+    print(f'Serving on http://{arguments.host}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if arguments.workers > 0:
+            pf2eConverter.close()
@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import random
+
+# Builds pf2etools shaped *-sublist-data.json files of any size for benchmarking the converter offline
+
+syllables = ['ka', 'vor', 'eth', 'dra', 'mel', 'zin', 'thu', 'gal', 'or', 'ish', 'bel', 'nyx', 'ar', 'quo', 'sil', 'tor']
+traitNames = ['Fire', 'Cold', 'Electricity', 'Acid', 'Sonic', 'Mental', 'Emotion', 'Fear', 'Healing', 'Negative', 'Positive', 'Force', 'Light', 'Darkness', 'Poison', 'Disease']
+schools = ['Abjuration', 'Conjuration', 'Divination', 'Enchantment', 'Evocation', 'Illusion', 'Necromancy', 'Transmutation']
+traditions = ['arcane', 'divine', 'occult', 'primal']
+creatureTypes = ['Dragon', 'Undead', 'Humanoid', 'Beast', 'Fiend', 'Construct', 'Elemental', 'Aberration']
+sizes = ['Tiny', 'Small', 'Medium', 'Large', 'Huge', 'Gargantuan']
+rarities = ['Common', 'Uncommon', 'Rare']
+conditions = ['frightened', 'sickened', 'clumsy', 'enfeebled', 'stupefied', 'slowed', 'grabbed', 'prone']
+damageTypes = ['fire', 'cold', 'piercing', 'slashing', 'bludgeoning', 'acid', 'electricity', 'negative']
+skillNames = ['Acrobatics', 'Arcana', 'Athletics', 'Deception', 'Intimidation', 'Religion', 'Stealth', 'Survival']
+
+def makeName(rng, words=2):
+    return ' '.join(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).capitalize() for _ in range(words))
+
+def makeSentence(rng, spellNames=None):
+    parts = ['The target takes {@damage ' + str(rng.randint(1, 6)) + 'd' + rng.choice(['4', '6', '8', '10']) + '} ' + rng.choice(damageTypes) + ' damage',
+             'becomes {@condition ' + rng.choice(conditions) + ' ' + str(rng.randint(1, 3)) + '}',
+             'can {@action Stride} up to its Speed',
+             'must attempt a {@skill ' + rng.choice(skillNames) + '} check',
+             'gains the {@trait ' + rng.choice(traitNames).lower() + '} trait',
+             'spends {@as ' + rng.choice(['1', '2', '3']) + '} to recover']
+    if spellNames:
+        parts.append('can cast {@spell ' + rng.choice(spellNames).lower() + '}')
+    return ' and '.join(rng.sample(parts, rng.randint(1, 3))).capitalize() + '.'
+
+def makeEntries(rng, spellNames=None, depth=0):
+    entries = [makeSentence(rng, spellNames) for _ in range(rng.randint(1, 3))]
+    roll = rng.random()
+    if roll < 0.25:
+        entries.append({'type' : 'successDegree', 'entries' : {
+            'Critical Success' : [makeSentence(rng)], 'Success' : [makeSentence(rng)],
+            'Failure' : [makeSentence(rng)], 'Critical Failure' : [makeSentence(rng)]}})
+    elif roll < 0.4:
+        entries.append({'type' : 'list', 'items' : [makeSentence(rng) for _ in range(rng.randint(2, 4))]})
+    elif roll < 0.45:
+        entries.append({'type' : 'table', 'rows' : [['Level', 'Effect']] + [[str(level), makeSentence(rng)] for level in range(1, 4)]})
+    elif roll < 0.5 and depth == 0:
+        entries.append(makeAbility(rng, spellNames, depth + 1))
+    return entries
+
+def makeActivity(rng):
+    roll = rng.random()
+    if roll < 0.6:
+        return {'number' : rng.randint(1, 3), 'unit' : 'action'}
+    if roll < 0.8:
+        return {'unit' : 'reaction'}
+    return {'unit' : 'free'}
+
+def makeAbility(rng, spellNames=None, depth=0):
+    ability = {'type' : 'ability', 'name' : makeName(rng, 1), 'entries' : makeEntries(rng, spellNames, depth + 1)}
+    if rng.random() < 0.6:
+        ability['activity'] = makeActivity(rng)
+    if rng.random() < 0.4:
+        ability['traits'] = rng.sample([trait.lower() for trait in traitNames], rng.randint(1, 3))
+    if rng.random() < 0.2:
+        ability['trigger'] = makeSentence(rng)
+    if rng.random() < 0.2:
+        ability['requirements'] = makeSentence(rng)
+    if rng.random() < 0.15:
+        ability['frequency'] = {'freq' : 1, 'unit' : rng.choice(['round', 'minute', 'day'])}
+    return ability
+
+# Shared abilities show up on many creatures, as they do in the real bestiaries
+commonAbilities = [
+    {'type' : 'ability', 'name' : 'Attack of Opportunity', 'activity' : {'unit' : 'reaction'}, 'entries' : ['The monster can use {@action Attack of Opportunity}.']},
+    {'type' : 'ability', 'name' : 'Grab', 'activity' : {'number' : 1, 'unit' : 'action'}, 'entries' : ['The monster automatically {@action Grab||Grabs} the target until the end of its next turn.']},
+    {'type' : 'ability', 'name' : 'Darkvision', 'entries' : ['The monster can see in darkness.']},
+    {'type' : 'ability', 'name' : 'Frightful Presence', 'traits' : ['aura', 'emotion', 'fear', 'mental'], 'entries' : ['A creature that first enters the area must attempt a Will save.', {'type' : 'successDegree', 'entries' : {'Success' : ['The creature is unaffected.'], 'Failure' : ['The creature is {@condition frightened 1}.'], 'Critical Failure' : ['The creature is {@condition frightened 2}.']}}]},
+]
+
+def generateSpells(rng, count):
+    spells = []
+    for index in range(count):
+        level = rng.randint(1, 10)
+        spell = {'name' : makeName(rng) + ' ' + str(index), 'source' : 'SYN', 'level' : level,
+                 'traits' : [rng.choice(schools)] + rng.sample(traitNames, rng.randint(0, 2)) + (['Uncommon'] if rng.random() < 0.1 else []),
+                 'traditions' : rng.sample(traditions, rng.randint(1, 3)),
+                 'cast' : {'number' : rng.randint(1, 3), 'unit' : 'action'}, 'components' : [rng.sample(['M', 'S', 'V'], rng.randint(1, 3))],
+                 'range' : {'entry' : str(rng.choice([30, 60, 120, 500])) + ' feet'},
+                 'entries' : makeEntries(rng)}
+        if rng.random() < 0.5:
+            spell['area'] = {'entry' : str(rng.choice([5, 10, 20, 30])) + '-foot ' + rng.choice(['burst', 'cone', 'line', 'emanation'])}
+        if rng.random() < 0.5:
+            spell['savingThrow'] = {'type' : [rng.choice(['F', 'R', 'W'])], 'basic' : rng.random() < 0.5}
+        if rng.random() < 0.3:
+            spell['duration'] = {'entry' : rng.choice(['1 minute', '1 round', '10 minutes', 'sustained'])}
+        if rng.random() < 0.4:
+            spell['heightened'] = {'plus_x' : {'level' : rng.randint(1, 2), 'entry' : makeSentence(rng)}}
+        elif rng.random() < 0.3:
+            spell['heightened'] = {'x' : [{'level' : heightenedLevel, 'entries' : [makeSentence(rng)]} for heightenedLevel in range(level + 1, min(level + 3, 10))]}
+        spells.append(spell)
+    return spells
+
+def generateRituals(rng, count):
+    return [{'name' : makeName(rng) + ' Rite ' + str(index), 'source' : 'SYN', 'level' : rng.randint(1, 10), 'traits' : [rng.choice(schools)],
+             'cast' : {'entry' : rng.choice(['1 hour', '1 day', '8 hours'])}, 'cost' : 'rare incense worth ' + str(rng.randint(1, 50) * 10) + ' gp',
+             'primaryCheck' : {'entry' : rng.choice(skillNames) + ' (expert)'}, 'secondaryCasters' : {'number' : rng.randint(1, 4)},
+             'entries' : makeEntries(rng)} for index in range(count)]
+
+def makeSpellcasting(rng, level, spellNames):
+    spellcasting = []
+    for castingType in rng.sample(['Prepared', 'Innate', 'Focus', 'Spontaneous'], rng.randint(1, 3)):
+        entry = {}
+        for spellLevel in range(0, min(10, (level + 1) // 2) + 1):
+            levelEntry = {'spells' : [{'name' : rng.choice(spellNames)} for _ in range(rng.randint(1, 4))]}
+            if castingType == 'Prepared' and spellLevel > 0:
+                levelEntry['slots'] = rng.randint(1, 3)
+            if spellLevel == 0:
+                levelEntry['level'] = min(10, max(1, (level + 1) // 2))
+            for spell in levelEntry['spells']:
+                if castingType == 'Innate' and rng.random() < 0.3:
+                    spell['amount'] = rng.choice([1, 2, 3, 'at will'])
+            entry[str(spellLevel)] = levelEntry
+        casting = {'tradition' : rng.choice(traditions), 'type' : castingType, 'DC' : 14 + level + rng.randint(0, 6), 'entry' : entry}
+        if castingType != 'Innate':
+            casting['attack'] = 6 + level
+        if castingType == 'Focus':
+            casting['fp'] = rng.randint(1, 3)
+            casting['name'] = rng.choice(['Bard', 'Cleric', 'Druid']) + ' Focus Spells'
+        spellcasting.append(casting)
+    return spellcasting
+
+def generateCreatures(rng, count, spellNames, ritualNames):
+    creatures = []
+    for index in range(count):
+        level = rng.randint(-1, 25)
+        creature = {'name' : makeName(rng) + ' ' + str(index), 'source' : 'SYN', 'level' : level,
+                    'rarity' : rng.choice(rarities), 'alignment' : rng.choice(['LG', 'NG', 'CG', 'LN', 'N', 'CN', 'LE', 'NE', 'CE']),
+                    'size' : rng.choice(sizes), 'creatureType' : rng.sample(creatureTypes, rng.randint(1, 2)), 'traits' : rng.sample(traitNames, rng.randint(0, 2)),
+                    'perception' : {'std' : level + 8}, 'senses' : [{'name' : 'darkvision'}] if rng.random() < 0.5 else [],
+                    'languages' : {'languages' : rng.sample(['Common', 'Draconic', 'Abyssal', 'Necril', 'Sylvan'], rng.randint(0, 3))},
+                    'skills' : {skill : {'std' : level + rng.randint(4, 12)} for skill in rng.sample(skillNames, rng.randint(1, 4))},
+                    'abilityMods' : {mod : rng.randint(-2, 7) for mod in ['str', 'dex', 'con', 'int', 'wis', 'cha']},
+                    'speed' : {'walk' : rng.choice([20, 25, 30, 40])},
+                    'attacks' : [{'range' : rng.choice(['Melee', 'Melee', 'Ranged']), 'name' : rng.choice(['jaws', 'claw', 'tail', 'longsword', 'spit']),
+                                  'attack' : level + rng.randint(6, 14), 'traits' : rng.sample(['agile', 'reach 10 feet', 'finesse', 'deadly d8'], rng.randint(0, 2)),
+                                  'damage' : str(rng.randint(1, 4)) + 'd' + rng.choice(['6', '8', '10', '12']) + '+' + str(rng.randint(0, 12)) + ' ' + rng.choice(damageTypes)}
+                                 for _ in range(rng.randint(1, 3))],
+                    'defenses' : {'ac' : {'std' : level + 15}, 'savingThrows' : {'fort' : {'std' : level + 8}, 'ref' : {'std' : level + 6}, 'will' : {'std' : level + 5}},
+                                  'hp' : [{'hp' : max(5, level * 18)}],
+                                  'resistances' : [{'name' : rng.choice(damageTypes), 'amount' : rng.randint(2, 15)}] if rng.random() < 0.3 else [],
+                                  'weaknesses' : [{'name' : rng.choice(damageTypes), 'amount' : rng.randint(2, 15)}] if rng.random() < 0.2 else []},
+                    'abilitiesTop' : [rng.choice(commonAbilities[2:3])] if rng.random() < 0.4 else [],
+                    'abilitiesMid' : rng.sample(commonAbilities, rng.randint(0, 2)) + [makeAbility(rng, spellNames) for _ in range(rng.randint(0, 2))],
+                    'abilitiesBot' : [makeAbility(rng, spellNames) for _ in range(rng.randint(1, 4))]}
+        if spellNames and rng.random() < 0.4:
+            creature['spellcasting'] = makeSpellcasting(rng, level, spellNames)
+        if ritualNames and rng.random() < 0.1:
+            creature['rituals'] = [{'tradition' : rng.choice(traditions).capitalize(), 'DC' : 20 + level, 'rituals' : [{'name' : rng.choice(ritualNames)}]}]
+        creatures.append(creature)
+    return creatures
+
+def generateFeats(rng, count, spellNames):
+    feats = []
+    for index in range(count):
+        feat = {'name' : makeName(rng) + ' ' + str(index), 'source' : 'SYN', 'level' : rng.randint(1, 20),
+                'traits' : rng.sample(['Fighter', 'Wizard', 'General', 'Skill', 'Archetype', 'Flourish', 'Rogue'], rng.randint(1, 3)),
+                'featType' : {'archetype' : [makeName(rng, 1)]} if rng.random() < 0.2 else {'class' : ['Fighter']},
+                'entries' : makeEntries(rng, spellNames)}
+        if rng.random() < 0.5:
+            feat['activity'] = makeActivity(rng)
+        if rng.random() < 0.3:
+            feat['prerequisites'] = 'trained in {@skill ' + rng.choice(skillNames) + '}'
+        if rng.random() < 0.15:
+            feat['frequency'] = {'freq' : rng.randint(1, 3), 'unit' : rng.choice(['round', 'hour', 'day'])}
+        if rng.random() < 0.1:
+            feat['special'] = [makeSentence(rng)]
+        feats.append(feat)
+    return feats
+
+def generateHazards(rng, count):
+    hazards = []
+    for index in range(count):
+        level = rng.randint(0, 20)
+        hazards.append({'name' : makeName(rng) + ' Trap ' + str(index), 'source' : 'SYN', 'level' : level, 'traits' : rng.sample(['Mechanical', 'Magical', 'Trap', 'Haunt'], 2),
+                        'description' : [makeSentence(rng)], 'stealth' : {'bonus' : level + 10, 'minProf' : rng.choice(['trained', 'expert', 'master'])},
+                        'disable' : {'entries' : ['{@skill Thievery} DC ' + str(level + 18) + ' to disable the trigger.']},
+                        'defenses' : {'ac' : {'std' : level + 14}, 'hardness' : {'std' : level + 5}, 'hp' : {'std' : level * 10 + 20}, 'bt' : {'std' : level * 5 + 10},
+                                      'savingThrows' : {'fort' : level + 8, 'ref' : level + 4}},
+                        'actions' : [makeAbility(rng), {'type' : 'attack', 'range' : rng.choice(['Melee', 'Ranged']), 'name' : 'spike', 'attack' : level + 10,
+                                                        'traits' : [], 'damage' : str(rng.randint(1, 4)) + 'd8 piercing'}],
+                        'reset' : [makeSentence(rng)], 'routine' : [makeSentence(rng)] if rng.random() < 0.3 else None})
+    return hazards
+
+def generateItems(rng, count):
+    items = []
+    for index in range(count):
+        item = {'name' : makeName(rng) + ' ' + str(index), 'source' : 'SYN', 'level' : rng.randint(0, 20), 'traits' : rng.sample(['Magical', 'Invested', 'Consumable', 'Alchemical'], rng.randint(0, 2)),
+                'price' : {'amount' : rng.randint(1, 5000), 'coin' : 'gp'}, 'bulk' : rng.choice(['L', '1', '2', '-']), 'usage' : rng.choice(['held in 1 hand', 'worn', 'worn cloak']),
+                'entries' : makeEntries(rng)}
+        roll = rng.random()
+        if roll < 0.25:
+            item['category'] = 'Weapon'
+            item['weaponData'] = {'damage' : '1d' + rng.choice(['4', '6', '8', '10', '12']), 'damageType' : rng.choice(['S', 'P', 'B']), 'group' : rng.choice(['Sword', 'Axe', 'Bow']),
+                                  'traits' : rng.sample(['agile', 'finesse', 'versatile P', 'deadly d8'], rng.randint(0, 2))}
+        elif roll < 0.4:
+            item['category'] = 'Armor'
+            item['armorData'] = {'ac' : rng.randint(1, 6), 'str' : rng.choice([10, 12, 14, 16]), 'checkPen' : -rng.randint(0, 3), 'dexCap' : rng.randint(0, 5),
+                                 'speedPen' : -rng.choice([0, 5, 10]), 'group' : rng.choice(['Chain', 'Plate', 'Leather'])}
+        elif roll < 0.5:
+            item['category'] = 'Shield'
+            item['shieldData'] = {'hardness' : rng.randint(3, 10), 'hp' : rng.randint(12, 60), 'bt' : rng.randint(6, 30), 'ac' : 2}
+        else:
+            item['category'] = rng.choice(['Worn', 'Held', 'Consumable', 'Rune'])
+            if rng.random() < 0.5:
+                item['activate'] = {'activity' : makeActivity(rng), 'components' : [rng.choice(['Interact', 'command', 'envision'])]}
+        if rng.random() < 0.05:
+            item['add_hash'] = rng.choice(['Greater', 'Lesser', 'Major'])
+        items.append(item)
+    return items
+
+def generateTraits(rng, count):
+    return [{'name' : makeName(rng, 1) + ' ' + str(index), 'categories' : [rng.choice(['General', 'Energy', 'Creature', 'Weapon'])], 'entries' : [makeSentence(rng)]} for index in range(count)]
+
+def generateBackgrounds(rng, count):
+    return [{'name' : makeName(rng, 1) + ' ' + str(index), 'source' : 'SYN', 'boosts' : rng.sample(['Strength', 'Dexterity', 'Constitution', 'Intelligence', 'Wisdom', 'Charisma'], 2) + ['Free'],
+             'skills' : [rng.choice(skillNames)], 'lore' : [makeName(rng, 1) + ' Lore'], 'feat' : makeName(rng), 'entries' : [makeSentence(rng), makeSentence(rng)]} for index in range(count)]
+
+def generateAfflictions(rng, count):
+    return [{'name' : makeName(rng) + ' ' + str(index), 'source' : 'SYN', 'level' : rng.randint(1, 20), 'traits' : [rng.choice(['disease', 'poison', 'curse'])],
+             'entries' : [makeSentence(rng), {'type' : 'affliction', 'DC' : rng.randint(15, 40), 'savingThrow' : 'Fortitude', 'onset' : '1 day',
+                                              'stages' : [{'stage' : stage, 'entry' : makeSentence(rng), 'duration' : '1 day'} for stage in range(1, rng.randint(2, 4))]}]}
+            for index in range(count)]
+
+def writeSyntheticExports(directory, records, seed=1):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    spells = generateSpells(rng, records)
+    rituals = generateRituals(rng, max(1, records // 20))
+    spellNames = [spell['name'] for spell in spells]
+    ritualNames = [ritual['name'] for ritual in rituals]
+    exports = {
+        'spells' : spells,
+        'rituals' : rituals,
+        'bestiary' : generateCreatures(rng, records, spellNames, ritualNames),
+        'feats' : generateFeats(rng, records, spellNames),
+        'hazards' : generateHazards(rng, max(1, records // 10)),
+        'items' : generateItems(rng, records),
+        'traits' : generateTraits(rng, max(1, records // 10)),
+        'backgrounds' : generateBackgrounds(rng, max(1, records // 10)),
+        'afflictions' : generateAfflictions(rng, max(1, records // 10)),
+    }
+    for name, data in exports.items():
+        with open(os.path.join(directory, name + '-sublist-data.json'), 'w') as file:
+            json.dump(data, file)
+    return {name : len(data) for name, data in exports.items()}
+
+def parseScale(scale):
+    scale = scale.lower()
+    if scale.endswith('k'):
+        return int(float(scale[:-1]) * 1000)
+    if scale.endswith('m'):
+        return int(float(scale[:-1]) * 1000000)
+    return int(scale)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic pf2etools sublist exports for benchmarking')
+    parser.add_argument('directory')
+    parser.add_argument('-r', '--records', default='1k', help='records per main category (spells, bestiary, feats, items), e.g. 1k, 10k, 100k')
+    parser.add_argument('--seed', type=int, default=1)
+    arguments = parser.parse_args()
+    counts = writeSyntheticExports(arguments.directory, parseScale(arguments.records), arguments.seed)
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
@@ -0,0 +1,33 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pythonparser
+
+@pytest.fixture
+def buildDB(tmp_path, monkeypatch):
+    # Writes the given records as exports into tmp_path and returns the db.xml a build of the folder writes.
+    # Keyword arguments set pythonparser globals for the build, every global is restored afterwards.
+    for name in ('rootXML', 'libraryEntries', 'recordSpool', 'idAllocator', 'referenceIndex', 'spellCatalogue', 'automationEffects', 'automationRows', 'linkTags'):
+        monkeypatch.setattr(pythonparser, name, getattr(pythonparser, name))
+    monkeypatch.setattr(pythonparser, 'inputPaths', [str(tmp_path)])
+    monkeypatch.setattr(pythonparser, 'categoryInputs', {})
+
+    def build(recordsByCategory=None, categories=None, **settings):
+        for categoryKey, records in (recordsByCategory or {}).items():
+            with open(tmp_path / pythonparser.recordCategories[categoryKey][0], 'w', encoding='utf-8') as file:
+                json.dump(records, file)
+        for name, value in settings.items():
+            monkeypatch.setattr(pythonparser, name, value)
+        pythonparser.spellCatalogue = None
+        selectedCategories = [(categoryKey, {}) for categoryKey in pythonparser.recordCategories
+                              if (categoryKey in categories if categories is not None else pythonparser.categoryFiles(categoryKey))]
+        output = io.BytesIO()
+        pythonparser.writeDBFile(output, selectedCategories)
+        return output.getvalue()
+
+    return build
@@ -0,0 +1,45 @@
+import csv
+import os
+
+import pythonparser
+
+def writeSheet(path, rows):
+    with open(path, 'w', newline='') as file:
+        csv.writer(file).writerows([['Creature', 'Level', 'Type', 'Ability', 'Status', 'Effect']] + rows)
+
+def test_match_exact_and_suffix():
+    names = pythonparser.AutomationNames()
+    warrior = names.add('Goblin Warrior')
+    elite = names.add('Goblin Commando', 'Elite')
+    names.add('Young Blue Dragon')
+    assert names.match('goblin  warrior!') == warrior
+    assert names.match('Goblin Warrior (Elite)') == warrior
+    assert names.match('Goblin Commando Elite') == elite
+    assert names.match('Young Brine Dragon') is None
+    assert names.closest('Young Brine Dragon') == 'Young Blue Dragon'
+
+def test_suffix_matching_two_names_is_not_a_match():
+    names = pythonparser.AutomationNames()
+    names.add('Goblin Warrior (Elite)')
+    names.add('Goblin Warrior (Weak)')
+    assert names.match('Goblin Warrior') is None
+
+def test_header_row_is_skipped(tmp_path):
+    sheet = str(tmp_path / 'automation.csv')
+    writeSheet(sheet, [['Goblin Warrior', '-1', '', 'Goblin Scuttle', '', 'EFFECT: Scuttle'], ['', '', '', 'Shortsword', '', 'ATK']])
+    effects, rows = pythonparser.readAutomationIndex(sheet)
+    assert effects == {'goblin warrior|goblin scuttle' : 'EFFECT: Scuttle', 'goblin warrior|shortsword' : 'ATK'}
+    assert rows['goblin warrior|shortsword'] == ['Goblin Warrior', 'Shortsword']
+
+def test_index_is_reused_until_the_sheet_changes(tmp_path, monkeypatch):
+    sheet = str(tmp_path / 'automation.csv')
+    writeSheet(sheet, [['Goblin Warrior', '-1', '', 'Goblin Scuttle', '', 'EFFECT: Scuttle']])
+    first = pythonparser.readAutomationIndex(sheet)
+    assert os.path.exists(sheet + '.index')
+    opened = []
+    realOpen = open
+    monkeypatch.setattr('builtins.open', lambda fileName, *args, **kwargs: opened.append(fileName) or realOpen(fileName, *args, **kwargs))
+    assert pythonparser.readAutomationIndex(sheet) == first
+    assert opened == [sheet + '.index']
+    writeSheet(sheet, [['Goblin Warrior', '-1', '', 'Goblin Scuttle', '', 'EFFECT: Scuttle, longer']])
+    assert pythonparser.readAutomationIndex(sheet)[0] == {'goblin warrior|goblin scuttle' : 'EFFECT: Scuttle, longer'}
@@ -0,0 +1,50 @@
+import random
+import xml.etree.ElementTree as ET
+
+import pythonparser
+import syntheticdata
+
+def summoner(name, creature):
+    return {'name' : name, 'source' : 'SYN', 'level' : 1, 'entries' : ['Summons:', {'type' : 'data', 'tag' : 'creature', 'data' : creature}]}
+
+def linkedNames(db, categoryName):
+    # Record name -> recordnames its links point to
+    return {record.findtext('name') : [link.get('recordname') for link in record.iter('link')]
+            for record in ET.fromstring(db).find(categoryName).find('category')}
+
+def countCalls(monkeypatch, name):
+    calls = []
+    function = getattr(pythonparser, name)
+    monkeypatch.setattr(pythonparser, name, lambda *args: calls.append(args) or function(*args))
+    return calls
+
+def test_repeat_across_records_is_converted_once(buildDB, monkeypatch):
+    creature = syntheticdata.generateCreatures(random.Random(1), 1, [], [])[0]
+    calls = countCalls(monkeypatch, 'writeSingleMonster')
+    feats = [summoner('Summon One', creature), summoner('Summon Two', creature)]
+    db = buildDB({'feats' : feats})
+    assert len(calls) == 1
+    npcs = ET.fromstring(db).find('npc').find('category')
+    assert len(npcs) == 1
+    links = linkedNames(db, 'feat')
+    assert links['Summon One'] == links['Summon Two'] == ['npc.' + npcs[0].tag]
+    # The workers get the embedded records of the chunks before theirs
+    assert buildDB({'feats' : feats}, conversionJobs=2, recordsPerChunk=1) == db
+
+def test_stable_ids_link_to_the_written_copy(buildDB):
+    creature = syntheticdata.generateCreatures(random.Random(1), 1, [], [])[0]
+    db = buildDB({'feats' : [summoner('Summon One', creature), summoner('Summon Two', creature)]}, stableRecordIDs=True)
+    npcs = ET.fromstring(db).find('npc').find('category')
+    assert len(npcs) == 1
+    assert set(sum(linkedNames(db, 'feat').values(), [])) == {'npc.' + npcs[0].tag}
+
+def test_unwritten_embed_is_converted_by_the_next_record(buildDB):
+    # The first feat holds the affliction in a field no writer reads, the second one has to write it after all
+    affliction = {'name' : 'Rot', 'source' : 'SYN', 'level' : 2, 'traits' : ['disease'], 'entries' : [{'type' : 'affliction', 'DC' : 18, 'savingThrow' : 'Fortitude'}]}
+    embed = {'type' : 'data', 'tag' : 'affliction', 'data' : affliction}
+    feats = [{'name' : 'Unread', 'source' : 'SYN', 'entries' : ['Text.'], 'unread' : [embed]},
+             {'name' : 'Spreads Rot', 'source' : 'SYN', 'entries' : ['Spreads:', embed]}]
+    db = buildDB({'feats' : feats})
+    afflictions = ET.fromstring(db).find('affliction').find('category')
+    assert [record.findtext('name') for record in afflictions] == ['Rot']
+    assert linkedNames(db, 'feat')['Spreads Rot'] == ['affliction.' + afflictions[0].tag]
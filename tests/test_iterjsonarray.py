@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import pythonparser
+
+records = [{'name': 'Fireball', 'level': 3, 'traits': ['fire', 'evocation']}, 12345, -1.5e3, 'text, with ] inside', [], {}, None, True]
+
+def writeExport(tmp_path, text):
+    fileName = str(tmp_path / 'spells-sublist-data.json')
+    with open(fileName, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return fileName
+
+@pytest.fixture
+def fallback(monkeypatch):
+    monkeypatch.setattr(pythonparser, 'ijson', None)
+
+@pytest.mark.parametrize('blockSize', [1, 2, 3, 7, 65536])
+@pytest.mark.parametrize('text', [json.dumps(records), json.dumps(records, indent=4), '  \n' + json.dumps(records) + '\n'])
+def test_matches_json_load(tmp_path, fallback, text, blockSize):
+    fileName = writeExport(tmp_path, text)
+    assert list(pythonparser.iterJSONArray(fileName, blockSize)) == json.loads(text)
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] '])
+def test_empty_array(tmp_path, fallback, text):
+    assert list(pythonparser.iterJSONArray(writeExport(tmp_path, text), 1)) == []
+
+@pytest.mark.parametrize('text', ['[1,]', '[,1]', '[1,,2]', '[1 2]', '[1', '[1,', '{"a": 1}', '', '1'])
+@pytest.mark.parametrize('blockSize', [1, 65536])
+def test_rejects_malformed(tmp_path, fallback, text, blockSize):
+    with pytest.raises(ValueError):
+        list(pythonparser.iterJSONArray(writeExport(tmp_path, text), blockSize))
+
+def test_ijson_rejects_object(tmp_path):
+    if pythonparser.ijson is None:
+        pytest.skip('ijson 3.1 or newer is not installed')
+    with pytest.raises(ValueError):
+        list(pythonparser.iterJSONArray(writeExport(tmp_path, '{"a": 1}')))
+
+def test_record_larger_than_block(tmp_path, fallback, monkeypatch):
+    # A record many blocks long is decoded a handful of times, not once per block
+    decodes = []
+
+    class CountingDecoder(json.JSONDecoder):
+        def raw_decode(self, s, index=0):
+            decodes.append(len(s) - index)
+            return super().raw_decode(s, index)
+
+    monkeypatch.setattr(json, 'JSONDecoder', CountingDecoder)
+    bigRecord = {'name': 'Huge', 'entries': ['x' * 100] * 400}
+    text = json.dumps([{'name': 'Small'}, bigRecord, {'name': 'After'}])
+    fileName = writeExport(tmp_path, text)
+    assert list(pythonparser.iterJSONArray(fileName, 1024)) == json.loads(text)
+    assert len(json.dumps(bigRecord)) > 30 * 1024
+    assert len(decodes) < 15
+    assert sum(decodes) < 4 * len(text)
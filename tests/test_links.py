@@ -0,0 +1,65 @@
+import xml.etree.ElementTree as ET
+
+def feat(name, text='Text.', source='SYN'):
+    return {'name' : name, 'source' : source, 'level' : 1, 'entries' : [text]}
+
+def spell(name, text='Text.', source='SYN'):
+    return {'name' : name, 'source' : source, 'level' : 1, 'traditions' : ['arcane'], 'cast' : {'number' : 2, 'unit' : 'action'}, 'entries' : [text]}
+
+def links(db, categoryName, name):
+    # (link text, recordname) of the links of the named record
+    for record in ET.fromstring(db).find(categoryName).find('category'):
+        if record.findtext('name') == name:
+            return [(link.text, link.get('recordname')) for link in record.iter('link') if link.get('class') != 'reference_trait']
+
+def recordName(db, categoryName, name):
+    for record in ET.fromstring(db).find(categoryName).find('category'):
+        if record.findtext('name') == name:
+            return categoryName + '.' + record.tag
+
+def test_link_to_merged_record(buildDB):
+    # Feats are merged before spells, so the spell's link is resolved while it is merged
+    db = buildDB({'feats' : [feat('Power Attack')], 'spells' : [spell('Fireball', 'See {@feat power attack}.')]})
+    assert links(db, 'spell', 'Fireball') == [('Feat: Power Attack', recordName(db, 'feat', 'Power Attack'))]
+    assert b' links="' not in db
+
+def test_link_to_later_record(buildDB):
+    # The spell is merged after the feat, the feat's placeholder is resolved when the spool is written
+    db = buildDB({'feats' : [feat('Power Attack', 'Cast {@spell fireball} and {@spell nothing}.')], 'spells' : [spell('Fireball')]})
+    assert links(db, 'feat', 'Power Attack') == [('Spell: Fireball', recordName(db, 'spell', 'Fireball'))]
+    assert b' links="' not in db
+
+def test_unknown_tags_leave_no_links(buildDB):
+    db = buildDB({'feats' : [feat('Power Attack', 'Cast {@spell nothing}.')]})
+    record = ET.fromstring(db).find('feat').find('category')[0]
+    assert record.find('.//linklist') is None
+    assert b'linklist' not in db
+
+def test_no_link_to_itself(buildDB):
+    db = buildDB({'spells' : [spell('Fireball', 'Unlike {@spell fireball}, {@spell shield|crb} protects.'), spell('Shield')]})
+    assert links(db, 'spell', 'Fireball') == [('Spell: Shield', recordName(db, 'spell', 'Shield'))]
+    assert links(db, 'spell', 'Shield') == []
+
+def test_source_is_preferred(buildDB):
+    db = buildDB({'feats' : [feat('Power Attack', 'Cast {@spell fireball|apg}, {@spell fireball|APG} or {@spell fireball}.')],
+                  'spells' : [spell('Fireball', source='CRB'), spell('Fireball', source='APG')]})
+    spells = {record.findtext('source') : 'spell.' + record.tag for record in ET.fromstring(db).find('spell').find('category')}
+    # The sourced tags name the APG Fireball once, the plain tag the first Fireball merged
+    assert sorted(recordName for _, recordName in links(db, 'feat', 'Power Attack')) == sorted([spells['APG'], spells['CRB']])
+
+def test_affliction_gets_links_field(buildDB):
+    affliction = {'name' : 'Blinding Sickness', 'source' : 'SYN', 'level' : 1, 'traits' : ['disease'],
+                  'entries' : ['Caught from {@spell fireball}.', {'type' : 'affliction', 'DC' : 20, 'savingThrow' : 'Fortitude'}]}
+    db = buildDB({'afflictions' : [affliction], 'spells' : [spell('Fireball')]})
+    record = ET.fromstring(db).find('affliction').find('category')[0]
+    assert record.find('links').get('type') == 'formattedtext'
+    assert links(db, 'affliction', 'Blinding Sickness') == [('Spell: Fireball', recordName(db, 'spell', 'Fireball'))]
+
+def test_links_match_across_jobs_and_cache(tmp_path, buildDB):
+    records = {'feats' : [feat('Power Attack', 'Cast {@spell fireball}.'), feat('Cleave', 'After {@feat power attack}.')],
+               'spells' : [spell('Fireball', 'Needs {@feat cleave}.')]}
+    serial = buildDB(records)
+    assert buildDB(records, conversionJobs=2, recordsPerChunk=1) == serial
+    cachePath = str(tmp_path / 'records.sqlite')
+    assert buildDB(records, recordCachePath=cachePath) == serial
+    assert buildDB(records, recordCachePath=cachePath) == serial
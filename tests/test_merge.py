@@ -0,0 +1,23 @@
+import xml.etree.ElementTree as ET
+
+import syntheticdata
+
+def test_chunks_and_jobs_do_not_change_the_module(tmp_path, buildDB):
+    syntheticdata.writeSyntheticExports(tmp_path, 20)
+    serial = buildDB()
+    assert buildDB(recordsPerChunk=3) == serial
+    assert buildDB(recordsPerChunk=3, conversionJobs=2) == serial
+    assert buildDB(recordsPerChunk=1, conversionJobs=3) == serial
+
+def test_ids_are_numbered_in_order_and_links_resolve(tmp_path, buildDB):
+    syntheticdata.writeSyntheticExports(tmp_path, 20)
+    root = ET.fromstring(buildDB(recordsPerChunk=3, conversionJobs=2))
+    recordNames = set()
+    for body in root:
+        category = body.find('category')
+        if category is not None and len(category):
+            assert [record.tag for record in category] == ['id-%05d' % number for number in range(1, len(category) + 1)]
+            recordNames.update(body.tag + '.' + record.tag for record in category)
+    links = [link.get('recordname') for link in root.iter('link') if link.get('recordname', '').partition('.')[0] in ('npc', 'spell', 'affliction', 'feat', 'item')]
+    assert links
+    assert set(links) <= recordNames
@@ -0,0 +1,27 @@
+import time
+
+import pythonparser
+
+def test_nested_phases_count_once(monkeypatch):
+    monkeypatch.setattr(pythonparser, 'profilingEnabled', True)
+    monkeypatch.setattr(pythonparser, 'phaseStats', {})
+    with pythonparser.PhaseTimer('outer', 10):
+        time.sleep(0.02)
+        with pythonparser.PhaseTimer('inner'):
+            time.sleep(0.1)
+    outerSeconds, outerRecords, outerGrowth = pythonparser.phaseStats['outer']
+    innerSeconds, innerRecords, innerGrowth = pythonparser.phaseStats['inner']
+    assert innerSeconds >= 0.1
+    assert 0.02 <= outerSeconds < 0.1
+    assert (outerRecords, innerRecords) == (10, 0)
+    assert outerGrowth >= 0 and innerGrowth >= 0
+    assert not pythonparser.activePhases
+    report = pythonparser.phaseStatsReport(outerSeconds + innerSeconds)
+    assert 'Peak RSS +MB' in report and 'peaked at' in report
+
+def test_profiling_off_records_nothing(monkeypatch):
+    monkeypatch.setattr(pythonparser, 'profilingEnabled', False)
+    monkeypatch.setattr(pythonparser, 'phaseStats', {})
+    with pythonparser.PhaseTimer('phase', 5):
+        pass
+    assert pythonparser.phaseStats == {}
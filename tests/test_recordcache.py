@@ -0,0 +1,52 @@
+import json
+import random
+import re
+
+import syntheticdata
+
+def feat(name, text='Text.'):
+    return {'name' : name, 'source' : 'SYN', 'level' : 1, 'entries' : [text]}
+
+def cacheCounts(capsys):
+    # (reused, converted) of the build that just ran
+    reused, converted = re.search(r'Record cache: (\d+) reused, (\d+) converted', capsys.readouterr().out).groups()
+    return int(reused), int(converted)
+
+def test_hit_miss_and_changed_record(tmp_path, buildDB, capsys):
+    cachePath = str(tmp_path / 'records.sqlite')
+    feats = [feat('Power Attack'), feat('Cleave'), feat('Sudden Charge')]
+    uncached = buildDB({'feats' : feats})
+    capsys.readouterr()
+    assert buildDB({'feats' : feats}, recordCachePath=cachePath) == uncached
+    assert cacheCounts(capsys) == (0, 3)
+    assert buildDB({'feats' : feats}, recordCachePath=cachePath) == uncached
+    assert cacheCounts(capsys) == (3, 0)
+    feats[1] = feat('Cleave', 'Changed text.')
+    changed = buildDB({'feats' : feats}, recordCachePath=cachePath)
+    assert cacheCounts(capsys) == (2, 1)
+    assert b'Changed text.' in changed
+    assert changed == buildDB({'feats' : feats})
+
+def test_settings_invalidate_the_cache(tmp_path, buildDB, capsys):
+    cachePath = str(tmp_path / 'records.sqlite')
+    feats = [feat('Power Attack'), feat('Cleave')]
+    buildDB({'feats' : feats}, recordCachePath=cachePath)
+    capsys.readouterr()
+    buildDB({'feats' : feats}, recordCachePath=cachePath, stableRecordIDs=True)
+    assert cacheCounts(capsys) == (0, 2)
+    buildDB({'feats' : feats}, recordCachePath=cachePath, stableRecordIDs=True, moduleName='other')
+    assert cacheCounts(capsys) == (0, 2)
+
+def test_spell_list_invalidates_casters_only(tmp_path, buildDB, capsys):
+    cachePath = str(tmp_path / 'records.sqlite')
+    spells = [{'name' : 'Fireball', 'source' : 'SYN', 'level' : 3, 'traditions' : ['arcane'], 'cast' : {'number' : 2, 'unit' : 'action'}, 'entries' : ['Boom.']}]
+    creatures = syntheticdata.generateCreatures(random.Random(1), 20, ['Fireball'], [])
+    caster = next(creature for creature in creatures if 'spellcasting' in creature)
+    fighter = next(creature for creature in creatures if 'spellcasting' not in creature and '"type": "data"' not in json.dumps(creature))
+    records = {'spells' : spells, 'monsters' : [caster, fighter], 'feats' : [feat('Power Attack')]}
+    buildDB(records, recordCachePath=cachePath)
+    capsys.readouterr()
+    spells[0]['entries'] = ['A bigger boom.']
+    buildDB(records, recordCachePath=cachePath)
+    # The spell and the caster's spellset changed, the fighter and the feat do not depend on the spell list
+    assert cacheCounts(capsys) == (2, 2)
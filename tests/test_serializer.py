@@ -0,0 +1,60 @@
+import copy
+import xml.etree.ElementTree as ET
+
+import pythonparser
+
+def elementTreeBytes(element, xmlDeclaration=False):
+    # How db.xml was written before the serializer: ET.indent, ET.tostring and the markup replacements on the whole file
+    element = copy.deepcopy(element)
+    ET.indent(element, level=0)
+    written = ET.tostring(element, encoding='utf-8', xml_declaration=xmlDeclaration)
+    written = written.replace(b'[a]&amp;', b'&').replace(b'&lt;', b'<').replace(b'&gt;', b'>')
+    return written.replace(b'[newline]', b'\n')
+
+def sampleRecord():
+    record = ET.Element('id-00001')
+    ET.SubElement(record, 'name', {'type' : 'string'}).text = 'Fire & Ice "Storm"'
+    ET.SubElement(record, 'casting', {'type' : 'string'}).text = '[a]&#143; '
+    ET.SubElement(record, 'desc', {'type' : 'string'}).text = 'Strike[newline]Then <b>bold</b> & more > less'
+    text = ET.SubElement(record, 'text', {'type' : 'formattedtext'})
+    ET.SubElement(text, 'p').text = 'One'
+    paragraph = ET.SubElement(text, 'p')
+    paragraph.text = 'Two '
+    ET.SubElement(paragraph, 'b').text = 'bold'
+    ET.SubElement(paragraph, 'i').text = 'italic'
+    paragraph[0].tail = ' and '
+    links = ET.SubElement(text, 'linklist')
+    ET.SubElement(links, 'link', {'class' : 'spelldesc', 'recordname' : 'spell.id-00002'}).text = 'Spell: Fire & Ice'
+    ET.SubElement(record, 'attribute', {'note' : 'a "quoted"\nline & tab\t<b>'})
+    ET.SubElement(record, 'empty')
+    ET.SubElement(record, 'blank').text = ''
+    level = ET.SubElement(record, 'level', {'type' : 'number'})
+    level.text = '  '
+    ET.SubElement(level, 'nested').text = '3'
+    return record
+
+def test_matches_element_tree():
+    record = sampleRecord()
+    assert pythonparser.serializeElement(record) == elementTreeBytes(record)
+    root = ET.Element('root', {'version' : '4.1'})
+    root.append(record)
+    assert pythonparser.serializeElement(root, xmlDeclaration=True) == elementTreeBytes(root, True)
+
+def test_escaping():
+    record = sampleRecord()
+    written = pythonparser.serializeElement(record).decode('utf-8')
+    assert '<name type="string">Fire &amp; Ice "Storm"</name>' in written
+    assert '<casting type="string">&#143; </casting>' in written
+    assert '<desc type="string">Strike\nThen <b>bold</b> &amp; more > less</desc>' in written
+    assert '<attribute note="a &quot;quoted&quot;&#10;line &amp; tab&#09;<b>" />' in written
+
+def test_tree_is_not_changed():
+    record = sampleRecord()
+    before = ET.tostring(record)
+    pythonparser.serializeElement(record, 3)
+    assert ET.tostring(record) == before
+
+def test_record_level_indentation():
+    record = ET.Element('id-00001')
+    ET.SubElement(record, 'name', {'type' : 'string'}).text = 'Goblin'
+    assert pythonparser.serializeRecord(record) == b'<id-00001>\n        <name type="string">Goblin</name>\n      </id-00001>'
@@ -0,0 +1,91 @@
+import io
+import json
+import multiprocessing
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+
+import converter
+import server
+
+feat = {'name' : 'Power Attack', 'source' : 'SYN', 'level' : 1, 'entries' : ['Hit {@b hard}.']}
+
+def waitForRelease(pf2eConverter, release):
+    release.wait(60)
+
+class BlockedModulePool(converter.ConverterPool):
+    # Module builds first wait in a worker until the test releases them
+    release = None
+
+    def buildModule(self, recordsByCategory, output, name=None, compressionLevel=None):
+        with self.moduleBuilds:
+            self.run(waitForRelease, self.release)
+        super().buildModule(recordsByCategory, output, name, compressionLevel)
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(pf2eConverter):
+        conversionServer = server.createServer(pf2eConverter, port=0)
+        threading.Thread(target=conversionServer.serve_forever, daemon=True).start()
+        servers.append(conversionServer)
+        return 'http://127.0.0.1:' + str(conversionServer.server_address[1])
+
+    yield start
+    for conversionServer in servers:
+        conversionServer.shutdown()
+        conversionServer.server_close()
+        if isinstance(conversionServer.RequestHandlerClass.converter, converter.ConverterPool):
+            conversionServer.RequestHandlerClass.converter.close()
+
+def post(url, data):
+    request = urllib.request.Request(url, json.dumps(data).encode('utf-8'), {'Content-Type' : 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+
+def test_convert_matches_converter(tmp_path, serve):
+    url = serve(converter.ConverterPool(2, inputPaths=[str(tmp_path)]))
+    status, body = post(url + '/convert/feats', feat)
+    assert status == 200
+    expected = converter.Converter([str(tmp_path)]).convertRecord('feats', feat)
+    assert json.loads(body) == {'fragments' : [{'category' : 'feat', 'xml' : fragment.xml.decode('utf-8')} for fragment in expected]}
+    with urllib.request.urlopen(url + '/metrics', timeout=60) as response:
+        assert json.loads(response.read())['caches']['workers'] == 1
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_bad_records_are_answered_with_400(tmp_path, serve, workers):
+    pf2eConverter = converter.ConverterPool(workers, inputPaths=[str(tmp_path)]) if workers else converter.Converter([str(tmp_path)])
+    url = serve(pf2eConverter)
+    assert post(url + '/convert/nothing', feat)[0] == 400
+    assert post(url + '/convert/spells', {'name' : 'No Cast', 'source' : 'SYN', 'entries' : []})[0] == 400
+    status, body = post(url + '/module', {'categories' : {'feats' : 'not a list'}})
+    assert status == 400
+    assert 'feats must be a list' in json.loads(body)['error']
+
+def test_convert_is_not_stuck_behind_module_builds(tmp_path, serve):
+    pool = BlockedModulePool(2, inputPaths=[str(tmp_path)])
+    manager = multiprocessing.get_context('spawn').Manager()
+    try:
+        pool.release = manager.Event()
+        url = serve(pool)
+        moduleResponse = []
+        moduleRequest = threading.Thread(target=lambda: moduleResponse.append(post(url + '/module', {'name' : 'Test', 'categories' : {'feats' : [feat]}})))
+        moduleRequest.start()
+        assert post(url + '/convert/feats?format=text', feat) == (200, json.dumps({'text' : '<p>Hit hard.</p>'}).encode('utf-8'))
+        assert moduleRequest.is_alive()
+        pool.release.set()
+        moduleRequest.join(60)
+        status, body = moduleResponse[0]
+        assert status == 200
+        with zipfile.ZipFile(io.BytesIO(body)) as module:
+            assert b'Power Attack' in module.read('db.xml')
+    finally:
+        pool.release.set()
+        manager.shutdown()
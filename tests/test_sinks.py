@@ -0,0 +1,30 @@
+import json
+import sqlite3
+
+import pytest
+
+import pythonparser
+
+creature = {'name' : 'Goblin Warrior', 'source' : 'B1', 'level' : -1, 'rarity' : 'Common', 'size' : 'Small', 'creatureType' : ['Humanoid'],
+            'traits' : ['Goblin', '{@trait fire}']}
+
+def test_normalized_record(monkeypatch):
+    monkeypatch.setattr(pythonparser, 'noteReferences', lambda s: pytest.fail('the sinks noted the references of ' + s))
+    normalized = pythonparser.normalizedRecord('monsters', creature)
+    assert normalized['traits'] == ['Common', 'Small', 'Humanoid', 'Goblin', 'fire']
+    assert (normalized['name'], normalized['source'], normalized['level'], normalized['record']) == ('Goblin Warrior', 'B1', -1, creature)
+
+def test_sinks_write_the_same_records(tmp_path):
+    jsonLines = pythonparser.JSONLinesSink(str(tmp_path / 'records.jsonl'))
+    database = pythonparser.SQLiteSink(str(tmp_path / 'records.db'))
+    for sink in (jsonLines, database):
+        sink.addRecords('monsters', [creature])
+        sink.addRecords('feats', [{'name' : 'Power Attack', 'level' : 1, 'traits' : ['Fighter', 'Flourish']}])
+        sink.close()
+    with open(tmp_path / 'records.jsonl', encoding='utf-8') as file:
+        lines = [json.loads(line) for line in file]
+    assert [(line['category'], line['name']) for line in lines] == [('monsters', 'Goblin Warrior'), ('feats', 'Power Attack')]
+    connection = sqlite3.connect(tmp_path / 'records.db')
+    rows = connection.execute('SELECT r.name FROM records r JOIN record_traits t ON t.record = r.id WHERE t.trait = ? COLLATE NOCASE', ('flourish',)).fetchall()
+    assert rows == [('Power Attack',)]
+    connection.close()
@@ -0,0 +1,33 @@
+import xml.etree.ElementTree as ET
+
+import syntheticdata
+
+def recordIDs(db):
+    # db.xml category name -> record name -> record tag
+    ids = {}
+    for body in ET.fromstring(db):
+        category = body.find('category')
+        if category is not None:
+            ids[body.tag] = {record.findtext('name') : record.tag for record in category}
+    return ids
+
+def test_stable_ids_are_six_digits(tmp_path, buildDB):
+    syntheticdata.writeSyntheticExports(tmp_path, 10)
+    for names in recordIDs(buildDB(stableRecordIDs=True)).values():
+        assert all(len(tag) == len('id-000001') for tag in names.values())
+
+def test_category_selection_keeps_ids(tmp_path, buildDB):
+    syntheticdata.writeSyntheticExports(tmp_path, 30)
+    everything = recordIDs(buildDB(stableRecordIDs=True))
+    featsOnly = recordIDs(buildDB(categories=['feats'], stableRecordIDs=True))
+    hazardsOnly = recordIDs(buildDB(categories=['hazards'], stableRecordIDs=True))
+    assert featsOnly['feat'] == everything['feat']
+    # Hazards share the npc category with creatures, without the creatures they still get the same IDs
+    assert hazardsOnly['npc'].items() <= everything['npc'].items()
+
+def test_added_record_keeps_ids(tmp_path, buildDB):
+    feats = [{'name' : 'Feat ' + str(index), 'source' : 'SYN', 'level' : 1, 'entries' : ['Text.']} for index in range(20)]
+    before = recordIDs(buildDB({'feats' : feats}, stableRecordIDs=True))['feat']
+    after = recordIDs(buildDB({'feats' : [{'name' : 'New Feat', 'source' : 'SYN', 'entries' : ['Text.']}] + feats}, stableRecordIDs=True))['feat']
+    assert before.items() <= after.items()
+    assert len(after) == 21